@@ -2,9 +2,12 @@
 
 import os
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 from apscheduler.schedulers.background import BackgroundScheduler
 from .config import Config
+from .util import ForkSafeExecutor
 
 import logging
 import sys
@@ -13,6 +16,27 @@ from concurrent_log_handler import ConcurrentRotatingFileHandler
 # Create extension instances without an app
 db = SQLAlchemy()
 scheduler = BackgroundScheduler(daemon=True)
+# Runs user-triggered work (e.g. IGDB searches) right away instead of waiting for a poll
+task_executor = ForkSafeExecutor(max_workers=4, thread_name_prefix='gamearr-task')
+
+def _upgrade_schema():
+    """
+    db.create_all() never alters existing tables, so columns and indexes added to a
+    model after a database was created are added here. Only nullable columns are supported.
+    """
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {col['name'] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            col_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'))
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
 
 def create_app(config_class=Config):
     app = Flask(__name__, instance_relative_config=True)
@@ -44,28 +68,42 @@ def create_app(config_class=Config):
     except OSError:
         pass
 
+    # NFO downloads land here; create it once instead of on every fetch
+    os.makedirs(os.path.join(app.root_path, 'nfo_storage'), exist_ok=True)
+
     db.init_app(app)
     
     from . import routes
     app.register_blueprint(routes.main)
     
-    from .util import timestamp_to_date_filter, fromjson_filter
+    from .util import timestamp_to_date_filter, fromjson_filter, OrjsonProvider
+    app.json = OrjsonProvider(app)
     app.jinja_env.filters['timestamp_to_date'] = timestamp_to_date_filter
     app.jinja_env.filters['fromjson'] = fromjson_filter
 
+    # Keep compiled templates on disk so restarted workers don't recompile them
+    jinja_cache_dir = os.path.join(app.instance_path, 'jinja_cache')
+    os.makedirs(jinja_cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory=jinja_cache_dir)
+    if not app.debug:
+        app.jinja_env.auto_reload = False
+
     with app.app_context():
         from . import models
         db.create_all()
+        _upgrade_schema()
 
         from . import jobs
+        jobs.backfill_alternative_release_types()
         jobs.register_cli_commands(app)
         if not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
             if not scheduler.running:
                 app.logger.info("Starting scheduler...")
                 scheduler.add_job(func=jobs.check_for_releases, trigger="interval", minutes=30, id="release_check_job", replace_existing=True, args=[app])
                 scheduler.add_job(func=jobs.update_download_statuses, trigger="interval", seconds=20, id="download_update_job", replace_existing=True, args=[app])
-                scheduler.add_job(func=jobs.process_search_tasks, trigger="interval", seconds=5, id="search_task_job", replace_existing=True, args=[app])
-                scheduler.add_job(func=jobs.process_release_check_queue, trigger="interval", seconds=10, id="release_queue_job", replace_existing=True, args=[app], max_instances=3)
+                scheduler.add_job(func=jobs.process_search_tasks, trigger="interval", minutes=1, id="search_task_job", replace_existing=True, args=[app])
+                scheduler.add_job(func=jobs.expire_stale_scan_tasks, trigger="interval", minutes=5, id="scan_task_expiry_job", replace_existing=True, args=[app])
+                scheduler.add_job(func=jobs.process_release_check_queue, trigger="interval", minutes=1, id="release_queue_job", replace_existing=True, args=[app])
                 scheduler.add_job(func=jobs.refresh_discover_cache, trigger="interval", hours=24, id="discover_refresh_job", replace_existing=True, args=[app])
                 scheduler.add_job(func=jobs.scan_all_library_games, trigger="interval", hours=12, id="additional_content_job", replace_existing=True, args=[app])
                 scheduler.add_job(func=jobs.auto_download_snatcher, trigger="interval", minutes=2, id="auto_snatcher_job", replace_existing=True, args=[app])
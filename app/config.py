@@ -13,4 +13,12 @@ class Config:
     # These are the paths the app will use. They are read from environment variables,
     # with the Docker paths as defaults.
     DOWNLOADS_PATH = os.getenv('DOWNLOADS_PATH', '/games/_downloads')
-    LIBRARY_PATH = os.getenv('LIBRARY_PATH', '/games')
\ No newline at end of file
+    LIBRARY_PATH = os.getenv('LIBRARY_PATH', '/games')
+
+    # --- Background Task Limits ---
+    # Maximum number of IGDB searches allowed to wait in the queue before new ones are rejected.
+    SEARCH_QUEUE_MAX_LEN = int(os.getenv('SEARCH_QUEUE_MAX_LEN', 20))
+    # Minutes a search may stay RUNNING before the fallback sweep marks it FAILED (e.g. after a worker restart).
+    SEARCH_TASK_TIMEOUT_MINUTES = int(os.getenv('SEARCH_TASK_TIMEOUT_MINUTES', 10))
+    # Minutes a library scan may stay PENDING/RUNNING before the sweep marks it FAILED; the scan page stops polling then too.
+    SCAN_TASK_TIMEOUT_MINUTES = int(os.getenv('SCAN_TASK_TIMEOUT_MINUTES', 30))
@@ -2,17 +2,18 @@
 
 from flask import current_app
 import json
+import orjson
 import shutil
 from pathlib import Path
 import requests
-import praw
 import re
 import html
 
-from . import db
-from .models import Game, SearchTask, AdditionalRelease, Setting, Profile
+from . import db, task_executor
+from .models import Game, SearchTask, ScanTask, AdditionalRelease, AlternativeRelease, Setting, Profile
 from datetime import datetime, timedelta
 import time
+from itertools import islice
 
 from .services import (
     get_settings_dict,
@@ -23,9 +24,44 @@ from .services import (
     search_jackett,
     add_to_qbittorrent,
     process_and_import_game,
-    process_and_import_addon
+    process_and_import_addon,
+    process_library_scan,
+    _classify_alternative_release
 )
 
+# qBittorrent states that mean a torrent is still downloading
+DOWNLOADING_STATES = frozenset({'downloading', 'pausedDL', 'metaDL', 'stalledDL'})
+
+# --- Status groups used by the scheduled jobs ---
+LIBRARY_STATUSES = frozenset({'Imported', 'Downloaded', 'Cracked (Scene)', 'Cracked (P2P)'})
+CRACKED_STATUSES = frozenset({'Cracked (Scene)', 'Cracked (P2P)'})
+NON_TRACKED_GAME_STATUSES = frozenset({'Monitoring', 'Cracked', 'Imported'})
+NON_TRACKED_ADDON_STATUSES = frozenset({'Not Snatched', 'Imported'})
+
+# Max flagged games the release-check sweep dispatches per run
+RELEASE_CHECK_BATCH_SIZE = 10
+
+# Max torrent hashes per torrents_info() call, keeps the WebUI request URL bounded
+QBIT_HASH_BATCH_SIZE = 100
+
+def _chunked(iterable, size):
+    """Yields lists of at most `size` items from `iterable`."""
+    it = iter(iterable)
+    return iter(lambda: list(islice(it, size)), [])
+
+def backfill_alternative_release_types():
+    """
+    One-off fix-up for alternative releases saved before release_type was stored.
+    Must be called inside an app context.
+    """
+    untyped = AlternativeRelease.query.filter(AlternativeRelease.release_type.is_(None)).all()
+    if not untyped:
+        return
+    for alt in untyped:
+        alt.release_type = _classify_alternative_release(alt)
+    db.session.commit()
+    current_app.logger.info(f"Backfilled release type for {len(untyped)} alternative releases.")
+
 def check_for_releases(app):
     """
     Scheduled job with INTELLIGENT MONITORING to find releases.
@@ -43,15 +79,19 @@ def check_for_releases(app):
         
         run_backlog_check = False
         backlog_check_interval_hours = 23
-        last_check_setting = Setting.query.get('last_backlog_check_timestamp')
-        
-        if not last_check_setting:
+
+        # The timestamp is kept in app.config after the first load; the DB is only written when it changes.
+        last_check_time = app.config.get('LAST_BACKLOG_CHECK_TIMESTAMP')
+        if last_check_time is None:
+            last_check_setting = Setting.query.get('last_backlog_check_timestamp')
+            if last_check_setting:
+                last_check_time = float(last_check_setting.value)
+                app.config['LAST_BACKLOG_CHECK_TIMESTAMP'] = last_check_time
+
+        if last_check_time is None:
             app.logger.info("    -> No last backlog check time found. Will run the backlog check now.")
             run_backlog_check = True
-            last_check_setting = Setting(key='last_backlog_check_timestamp', value='0')
-            db.session.add(last_check_setting)
         else:
-            last_check_time = float(last_check_setting.value)
             hours_since_last_check = (time.time() - last_check_time) / 3600
             if hours_since_last_check > backlog_check_interval_hours:
                 app.logger.info(f"    -> It has been {hours_since_last_check:.1f} hours since the last backlog check. Running it now.")
@@ -77,45 +117,52 @@ def check_for_releases(app):
                 app.logger.info(f"    -> Checking 'backlog' release: '{game.official_title}'")
                 process_all_releases_for_game(game.id)
 
-            time.sleep(2)    
-
         if run_backlog_check:
-            last_check_setting.value = str(time.time())
+            now = time.time()
+            last_check_setting = Setting.query.get('last_backlog_check_timestamp')
+            if last_check_setting:
+                last_check_setting.value = str(now)
+            else:
+                db.session.add(Setting(key='last_backlog_check_timestamp', value=str(now)))
+            app.config['LAST_BACKLOG_CHECK_TIMESTAMP'] = now
             app.logger.info("    -> Updating last backlog check timestamp to now.")
         
         db.session.commit()
 
-def process_release_check_queue(app):
+def run_release_check(app, game_id):
     """
-    Looks for games that have been flagged for an immediate release check,
-    processes one, and then un-flags it.
-
-    FIXED: Now includes proper session management to avoid stale reads.
+    Runs an immediate release check for a single flagged game. Submitted to the
+    task executor by the routes that set needs_release_check, so no polling is needed.
     """
     with app.app_context():
         try:
-            # Query for a game that needs a check
-            game_to_check = Game.query.filter_by(needs_release_check=True).order_by(Game.id).first()
-            
-            if game_to_check:
-                app.logger.info(f"Task Queue: Claiming '{game_to_check.official_title}' for an immediate release check.")
-                
-                # Immediately flip the flag and commit so other workers don't grab the same job.
-                game_to_check.needs_release_check = False
-                db.session.commit()
-                
-                # Now, run the potentially long-running process.
-                process_all_releases_for_game(game_to_check.id)
-            # Optional: Add an else block for debugging to confirm the job is running
-            # else:
-            #     app.logger.info("Task Queue: No games found needing an immediate release check.")
+            # Atomically flip the flag so the fallback sweep (or another worker) can't grab the same job.
+            claimed = Game.query.filter_by(id=game_id, needs_release_check=True).update({'needs_release_check': False})
+            db.session.commit()
+            if not claimed:
+                return
 
+            app.logger.info(f"Task Queue: Claimed game {game_id} for an immediate release check.")
+            process_all_releases_for_game(game_id)
         finally:
-            # THIS IS THE CRITICAL FIX:
             # This ensures the database session is closed and removed at the end of the
             # job's execution. The next run will get a fresh session.
             db.session.remove()
 
+def process_release_check_queue(app):
+    """
+    Fallback sweep for games still flagged for an immediate release check, e.g. because
+    the process restarted before the executor ran them. Hands up to
+    RELEASE_CHECK_BATCH_SIZE games per run to the shared task executor.
+    """
+    with app.app_context():
+        try:
+            game_ids = [game_id for (game_id,) in db.session.query(Game.id).filter_by(needs_release_check=True).order_by(Game.id).limit(RELEASE_CHECK_BATCH_SIZE)]
+        finally:
+            db.session.remove()
+    for game_id in game_ids:
+        task_executor.submit(run_release_check, app, game_id)
+
 def scan_all_library_games(app):
     """
     Scheduled job that runs the unified scanner on ALL library games
@@ -123,13 +170,12 @@ def scan_all_library_games(app):
     """
     with app.app_context():
         app.logger.info("Scheduler: Running full library scan for ALL releases.")
-        library_statuses = ['Imported', 'Downloaded', 'Cracked (Scene)', 'Cracked (P2P)']
         
         offset = 0
         batch_size = 50
         
         while True:
-            games_in_batch = Game.query.filter(Game.status.in_(library_statuses)).limit(batch_size).offset(offset).all()
+            games_in_batch = Game.query.filter(Game.status.in_(list(LIBRARY_STATUSES))).limit(batch_size).offset(offset).all()
             if not games_in_batch:
                 app.logger.info("Scheduler: Finished full library scan.")
                 break
@@ -139,33 +185,100 @@ def scan_all_library_games(app):
             for game in games_in_batch:
                 # Call the single, powerful, unified engine for each game
                 process_all_releases_for_game(game.id)
-                time.sleep(2)
             
             offset += batch_size
 
+def run_search_task(app, task_id):
+    """
+    Runs a single IGDB search task. Submitted to the task executor as soon as the
+    search is created, so the user doesn't wait for the next scheduler tick.
+    """
+    with app.app_context():
+        try:
+            # Atomically claim the task so the fallback sweep can't run it twice.
+            claimed = SearchTask.query.filter_by(id=task_id, status='PENDING').update({'status': 'RUNNING'})
+            db.session.commit()
+            if not claimed:
+                return
+
+            try:
+                task = SearchTask.query.get(task_id)
+                app.logger.info(f"Background search: Processing task {task.id} for '{task.search_term}'")
+                igdb_results = search_igdb(task.search_term)
+                task.results = orjson.dumps(igdb_results).decode()
+                task.status = 'COMPLETE'
+            except Exception as e:
+                app.logger.error(f"Background search task {task_id} failed: {e}")
+                db.session.rollback()
+                SearchTask.query.filter_by(id=task_id).update({'status': 'FAILED'})
+            db.session.commit()
+        finally:
+            db.session.remove()
+
 def process_search_tasks(app):
-    # THE FIX: We use the passed-in 'app' to create the context,
-    # not the problematic 'current_app'.
+    """
+    Fallback sweep for search tasks that were never dispatched (e.g. the process
+    restarted before the executor picked them up). Normal searches run immediately.
+    Tasks stuck RUNNING past SEARCH_TASK_TIMEOUT_MINUTES are marked FAILED so they
+    stop counting against SEARCH_QUEUE_MAX_LEN.
+    """
+    with app.app_context():
+        cutoff = datetime.utcnow() - timedelta(minutes=app.config['SEARCH_TASK_TIMEOUT_MINUTES'])
+        expired = SearchTask.query.filter(SearchTask.status == 'RUNNING', SearchTask.created_at < cutoff).update({'status': 'FAILED'})
+        db.session.commit()
+        if expired:
+            app.logger.warning(f"Search sweep: Marked {expired} stuck search task(s) as FAILED.")
+        pending_ids = [task_id for (task_id,) in db.session.query(SearchTask.id).filter_by(status='PENDING').order_by(SearchTask.created_at)]
+    for task_id in pending_ids:
+        run_search_task(app, task_id)
+
+def run_library_scan_task(app, task_id):
+    """
+    Runs a library folder scan (filesystem walk + IGDB lookups) off the request thread.
+    The UI polls /library/scan/data/<task_id> for the results.
+    """
     with app.app_context():
-        task = SearchTask.query.filter_by(status='PENDING').order_by(SearchTask.created_at).first()
-        if task:
-            app.logger.info(f"Background search: Processing task {task.id} for '{task.search_term}'")
-            igdb_results = search_igdb(task.search_term)
-            task.results = json.dumps(igdb_results)
-            task.status = 'COMPLETE'
+        try:
+            claimed = ScanTask.query.filter_by(id=task_id, status='PENDING').update({'status': 'RUNNING'})
+            db.session.commit()
+            if not claimed:
+                return
+
+            app.logger.info(f"Background scan: Processing library scan task {task_id}")
+            try:
+                scan_results = process_library_scan()
+                ScanTask.query.filter_by(id=task_id).update({'status': 'COMPLETE', 'results': orjson.dumps(scan_results).decode()})
+            except Exception as e:
+                app.logger.error(f"Library scan task {task_id} failed: {e}")
+                db.session.rollback()
+                ScanTask.query.filter_by(id=task_id).update({'status': 'FAILED'})
             db.session.commit()
+        finally:
+            db.session.remove()
+
+def expire_stale_scan_tasks(app):
+    """
+    Marks library scans that never finished (lost to a worker restart or kill) as FAILED
+    once they are older than SCAN_TASK_TIMEOUT_MINUTES, so the scan page stops waiting.
+    """
+    with app.app_context():
+        cutoff = datetime.utcnow() - timedelta(minutes=app.config['SCAN_TASK_TIMEOUT_MINUTES'])
+        expired = ScanTask.query.filter(ScanTask.status.in_(['PENDING', 'RUNNING']), ScanTask.created_at < cutoff).update({'status': 'FAILED'})
+        db.session.commit()
+        if expired:
+            app.logger.warning(f"Scan sweep: Marked {expired} stuck library scan(s) as FAILED.")
 
 def update_download_statuses(app):
     """Scheduled job to check qBittorrent for download progress for BOTH games and addons."""
     with app.app_context():
         # --- Find items to track ---
         games_to_track = Game.query.filter(
-            Game.status.notin_(['Monitoring', 'Cracked', 'Imported']),
+            Game.status.notin_(list(NON_TRACKED_GAME_STATUSES)),
             Game.torrent_hash.isnot(None)
         ).all()
         
         addons_to_track = AdditionalRelease.query.filter(
-            AdditionalRelease.status.notin_(['Not Snatched', 'Imported']),
+            AdditionalRelease.status.notin_(list(NON_TRACKED_ADDON_STATUSES)),
             AdditionalRelease.torrent_hash.isnot(None)
         ).all()
         
@@ -181,7 +294,9 @@ def update_download_statuses(app):
 
         try:
             client = get_qbit_client()
-            torrents_info = client.torrents_info(torrent_hashes=list(items_by_hash.keys()))
+            torrents_info = []
+            for hash_batch in _chunked(items_by_hash.keys(), QBIT_HASH_BATCH_SIZE):
+                torrents_info.extend(client.torrents_info(torrent_hashes=hash_batch))
             active_hashes = {t.hash for t in torrents_info}
 
             for torrent in torrents_info:
@@ -189,14 +304,14 @@ def update_download_statuses(app):
                 if not item: continue
                 
                 # Skip items that are already fully processed
-                if item.status in ['Imported']:
+                if item.status == 'Imported':
                     continue
 
                 new_status = item.status
                 if torrent.progress >= 1:
                     new_status = "Downloaded"
-                elif torrent.state in ['downloading', 'pausedDL', 'metaDL', 'stalledDL']:
-                    new_status = f"Downloading {torrent.progress * 100:.0f}%"
+                elif torrent.state in DOWNLOADING_STATES:
+                    new_status = f"Downloading {int(torrent.progress * 100)}%"
                 elif torrent.state == 'error':
                     new_status = "Error"
                 
@@ -237,7 +352,7 @@ def auto_download_snatcher(app):
             return
 
         games_to_snatch = Game.query.join(Profile).filter(
-            Game.status.in_(['Cracked (Scene)', 'Cracked (P2P)'])
+            Game.status.in_(list(CRACKED_STATUSES))
         ).all()
         
         if not games_to_snatch:
@@ -270,26 +385,23 @@ def auto_download_snatcher(app):
             if game.release_name:
                  candidates.append({'name': game.release_name, 'group': game.release_group, 'type': game.release_type})
             for alt in game.alternative_releases:
-                release_type = 'Repack' if alt.source.upper() in {'FITGIRL', 'DODI', 'ELAMIGOS'} else 'P2P'
-                if alt.source.upper() not in {'FITGIRL', 'DODI', 'ELAMIGOS'}:
-                    if '-' in alt.release_name and ' ' not in alt.release_name.split('-')[-1]:
-                         release_type = 'Scene'
-                candidates.append({'name': alt.release_name, 'group': alt.source, 'type': release_type})
+                candidates.append({'name': alt.release_name, 'group': alt.source, 'type': alt.release_type})
             
             # ... (Filtering and scoring logic is unchanged) ...
+            # The first acceptable candidate from a preferred group wins outright;
+            # otherwise fall back to the first acceptable candidate.
             best_candidate = None
-            highest_score = -1
-            profile_types = json.loads(profile.release_types)
-            profile_preferred = [g.upper() for g in json.loads(profile.preferred_groups)]
-            profile_avoided = [g.upper() for g in json.loads(profile.avoided_groups)]
+            profile_types = set(json.loads(profile.release_types))
+            profile_preferred = {g.upper() for g in json.loads(profile.preferred_groups)}
+            profile_avoided = {g.upper() for g in json.loads(profile.avoided_groups)}
             for cand in candidates:
                 cand_group_upper = cand['group'].upper()
                 if cand['type'] not in profile_types: continue
                 if cand_group_upper in profile_avoided: continue
-                score = 0
-                if cand_group_upper in profile_preferred: score += 100
-                if score > highest_score:
-                    highest_score = score
+                if cand_group_upper in profile_preferred:
+                    best_candidate = cand
+                    break
+                if best_candidate is None:
                     best_candidate = cand
 
             # 4. Snatch the Best Match
@@ -344,32 +456,38 @@ def process_completed_downloads(app):
         # --- END OF NEW LOGIC ---
 
         # --- Priority 1: Process a completed base game ---
-        game_to_process = Game.query.filter_by(status='Downloaded').first()
-        if game_to_process:
-            app.logger.info(f"Post-Processor: Found downloaded game '{game_to_process.official_title}'. Claiming...")
-            game_to_process.status = 'Importing'
+        # Only project the columns we need; the full row is loaded by the importer itself.
+        game_row = db.session.query(Game.id, Game.official_title).filter_by(status='Downloaded').first()
+        if game_row:
+            game_id, game_title = game_row
+            app.logger.info(f"Post-Processor: Found downloaded game '{game_title}'. Claiming...")
+            # Claim with a single conditional UPDATE so a concurrent run can't grab it too.
+            claimed = Game.query.filter_by(id=game_id, status='Downloaded').update({'status': 'Importing'})
             db.session.commit()
+            if not claimed:
+                return
             try:
-                process_and_import_game(game_to_process.id)
+                process_and_import_game(game_id)
             except Exception as e:
-                app.logger.error(f"A critical error occurred during game import for '{game_to_process.official_title}'. Reverting status. Error: {e}")
-                game = Game.query.get(game_to_process.id)
-                if game and game.status == 'Importing': # Check status to avoid race conditions
-                    game.status = 'Downloaded'
-                    db.session.commit()
+                app.logger.error(f"A critical error occurred during game import for '{game_title}'. Reverting status. Error: {e}")
+                Game.query.filter_by(id=game_id, status='Importing').update({'status': 'Downloaded'}) # Check status to avoid race conditions
+                db.session.commit()
             return # Exit after processing one item
 
         # --- Priority 2: Process a completed addon ---
-        addon_to_process = AdditionalRelease.query.filter_by(status='Downloaded').first()
-        if addon_to_process:
-            app.logger.info(f"Post-Processor: Found downloaded addon '{addon_to_process.release_name}'. Claiming...")
-            addon_to_process.status = 'Installing'
+        addon_row = db.session.query(AdditionalRelease.id, AdditionalRelease.release_name).filter_by(status='Downloaded').first()
+        if addon_row:
+            addon_id, addon_name = addon_row
+            app.logger.info(f"Post-Processor: Found downloaded addon '{addon_name}'. Claiming...")
+            claimed = AdditionalRelease.query.filter_by(id=addon_id, status='Downloaded').update({'status': 'Installing'})
             db.session.commit()
+            if not claimed:
+                return
             try:
-                process_and_import_addon(addon_to_process.id)
+                process_and_import_addon(addon_id)
             except Exception as e:
                 # The addon engine handles its own status reversion
-                app.logger.error(f"A critical error occurred during addon import for '{addon_to_process.release_name}'.")
+                app.logger.error(f"A critical error occurred during addon import for '{addon_name}'.")
             return # Exit after processing one item
 
 def refresh_discover_cache(app):
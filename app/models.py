@@ -1,7 +1,7 @@
 # /gamearr/app/models.py
 
 from . import db  # We will create this 'db' object in __init__.py
-from datetime import datetime
+from sqlalchemy.sql import func
 
 class Game(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -24,13 +24,14 @@ class Game(db.Model):
     videos_urls = db.Column(db.Text, nullable=True) # For trailers, etc.
 
     # --- Status and Release Info (Already Have) ---
+    # Free-form: besides the fixed states this holds live progress like 'Downloading 42%'
     status = db.Column(db.String, default='Monitoring', nullable=False)
     release_name = db.Column(db.String, nullable=True)
     release_group = db.Column(db.String, nullable=True)
     release_type = db.Column(db.String, nullable=True)
     nfo_path = db.Column(db.String, nullable=True)
     nfo_img_path = db.Column(db.String, nullable=True)
-    torrent_hash = db.Column(db.String, nullable=True)
+    torrent_hash = db.Column(db.String, nullable=True, index=True)
     local_path = db.Column(db.String, nullable=True)
 
     # --- Relationship to Additional Releases ---
@@ -44,11 +45,20 @@ class Game(db.Model):
     # --- Link to Download Profile ---
     profile_id = db.Column(db.Integer, db.ForeignKey('profile.id'), nullable=True)
     profile = db.relationship('Profile', backref='games')    
+
+    # Composite indexes backing the library page's keyset pagination.
+    # (status, id) also serves plain status filters and the DISTINCT status query.
+    __table_args__ = (
+        db.Index('ix_game_status_id', 'status', 'id'),
+        db.Index('ix_game_official_title_id', 'official_title', 'id'),
+        db.Index('ix_game_release_date_id', 'release_date', 'id'),
+    )
     
 class AlternativeRelease(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     release_name = db.Column(db.String(300), nullable=False)
     source = db.Column(db.String(50), nullable=False)
+    release_type = db.Column(db.String(20), nullable=True) # 'Scene', 'P2P', 'Repack'
     game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
     
     # --- NEW NFO Fields ---
@@ -62,7 +72,7 @@ class AdditionalRelease(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     release_name = db.Column(db.String, nullable=False, unique=True)
     release_type = db.Column(db.String, nullable=False) # 'Update', 'DLC', 'Fix', 'Trainer'
-    status = db.Column(db.String, default='Not Snatched', nullable=False)
+    status = db.Column(db.String, default='Not Snatched', nullable=False, index=True)
     source = db.Column(db.String(50), nullable=True)
     
     torrent_hash = db.Column(db.String, nullable=True)
@@ -110,12 +120,19 @@ class Profile(db.Model):
 class SearchTask(db.Model):
     id = db.Column(db.String, primary_key=True)
     search_term = db.Column(db.String, nullable=False)
-    status = db.Column(db.String, default='PENDING', nullable=False)
+    status = db.Column(db.String, default='PENDING', nullable=False, index=True)
+    results = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=func.now(), server_default=func.now())
+
+class ScanTask(db.Model):
+    # Background library scans; results hold the JSON list of folders and IGDB matches
+    id = db.Column(db.String, primary_key=True)
+    status = db.Column(db.String, default='PENDING', nullable=False, index=True)
     results = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=func.now(), server_default=func.now())
 
 class DiscoverCache(db.Model):
     # This table will store the raw JSON content of a discover list
     list_name = db.Column(db.String, primary_key=True) # e.g., 'anticipated', 'coming_soon'
     content = db.Column(db.Text, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = db.Column(db.DateTime, default=func.now(), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
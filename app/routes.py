@@ -1,77 +1,163 @@
 from flask import (
     Blueprint, render_template, request, redirect, url_for, 
-    send_from_directory, current_app, jsonify, flash
+    send_from_directory, current_app, jsonify, flash, abort, Response
 )
 import uuid
 import json
+import orjson
 import os
-from datetime import timedelta
+from datetime import datetime, timedelta
 import time
+import threading
+from functools import lru_cache
 import re
 import shutil
 from pathlib import Path
-
-from . import db
-from .models import Game, Setting, SearchTask, DiscoverCache, Indexer, Profile, AdditionalRelease
-from .services import search_jackett, add_to_qbittorrent, get_qbit_client, process_library_scan, get_igdb_game_details, _refine_search_term
+from sqlalchemy import update, and_, or_
+from sqlalchemy.orm import selectinload, load_only
+
+from . import db, task_executor
+from .models import Game, Setting, SearchTask, DiscoverCache, Indexer, Profile, AdditionalRelease, AlternativeRelease, ScanTask
+from .services import (
+    search_jackett, add_to_qbittorrent, get_qbit_client, get_igdb_game_details, _refine_search_term, _safe_folder_name, _dialect_insert, get_settings_dict, invalidate_settings_cache,
+    get_titles_for_hashes, remember_torrent_title, forget_torrent_title
+)
+from .jobs import run_search_task, run_release_check, run_library_scan_task
 
 main = Blueprint('main', __name__)
 
+# Decoded DiscoverCache content, keyed by list_name -> (updated_at, data)
+_decoded_discover_lists = {}
+
+# qBittorrent states that count as seeding for the activity page's seeding time
+SEEDING_STATES = frozenset({'uploading', 'stalledUP', 'checkingUP', 'forcedUP'})
+
+# Seconds a built /activity/data payload is shared between polls
+ACTIVITY_SNAPSHOT_TTL = 2
+# (expires_at, json_body) for the last built activity payload
+_activity_snapshot = None
+# True while one poll is rebuilding the snapshot; bumped generation discards a rebuild that raced an invalidation
+_activity_refreshing = False
+_activity_generation = 0
+_activity_lock = threading.Lock()
+
+# (suffix, divisor) pairs indexed by floor(log1024(size))
+_BYTE_UNITS = (('B', 1), ('KB', 1 << 10), ('MB', 1 << 20), ('GB', 1 << 30), ('TB', 1 << 40), ('PB', 1 << 50), ('EB', 1 << 60))
+
+@main.app_template_filter('format_bytes')
+@lru_cache(maxsize=4096)
 def format_bytes(size):
     """Converts bytes to a human-readable string (KB, MB, GB)."""
-    if size == 0:
+    size = int(size)
+    if size <= 0:
         return "0 B"
-    power = 1024
-    n = 0
-    power_labels = {0: '', 1: 'K', 2: 'M', 3: 'G', 4: 'T'}
-    while size > power and n < len(power_labels):
-        size /= power
-        n += 1
-    return f"{size:.2f} {power_labels[n]}B"
-
-def format_seconds(seconds):
-    """Formats a duration in seconds into a human-readable string."""
-    if seconds < 0:
-        return ""
-    days = int(seconds // (24 * 3600))
-    hours = int((seconds % (24 * 3600)) // 3600)
-    minutes = int((seconds % 3600) // 60)
-    
-    if days > 0:
-        return f"{days}d {hours}h"
-    elif hours > 0:
-        return f"{hours}h {minutes}m"
-    else:
-        return f"{minutes}m"
+    unit, divisor = _BYTE_UNITS[min((size.bit_length() - 1) // 10, len(_BYTE_UNITS) - 1)]
+    return f"{size / divisor:.2f} {unit}"
+
+# --- Library page keyset pagination ---
+INDEX_PAGE_SIZE = 25
+
+# sort_by value -> (sort column, descending). Game.id breaks ties in the same direction.
+INDEX_SORTS = {
+    'id_desc': (Game.id, True),
+    'title_asc': (Game.official_title, False),
+    'release_date_desc': (Game.release_date, True),
+}
+
+def _keyset_condition(column, anchor_value, anchor_id, less_than):
+    """
+    Selects rows that come strictly after the anchor (value, id) in the given direction.
+    NULLs are treated as the smallest value, which is how SQLite orders them.
+    """
+    if less_than:
+        if anchor_value is None:
+            return and_(column.is_(None), Game.id < anchor_id)
+        condition = or_(column < anchor_value, and_(column == anchor_value, Game.id < anchor_id))
+        return or_(condition, column.is_(None)) if column.nullable else condition
+    if anchor_value is None:
+        return or_(column.isnot(None), Game.id > anchor_id)
+    return or_(column > anchor_value, and_(column == anchor_value, Game.id > anchor_id))
+
+# Seconds the library page's status filter options are reused before re-querying
+STATUS_OPTIONS_TTL = 300
+# (expires_at, statuses) for the distinct Game.status values
+_status_options = None
+
+def _get_all_statuses():
+    """Returns the distinct game statuses for the filter dropdown, cached for STATUS_OPTIONS_TTL."""
+    global _status_options
+    if _status_options is None or time.monotonic() >= _status_options[0]:
+        statuses = [s[0] for s in db.session.query(Game.status).distinct()]
+        _status_options = (time.monotonic() + STATUS_OPTIONS_TTL, statuses)
+    return _status_options[1]
+
+# Seconds the profile picker list is reused; profile edits in this worker drop it immediately
+PROFILE_OPTIONS_TTL = 60
+# (expires_at, [{'id', 'name', 'is_default'}, ...]) with the default profile first
+_profile_options = None
+
+def _get_profile_options():
+    """Returns the JSON-friendly profile list for the search results page."""
+    global _profile_options
+    if _profile_options is None or time.monotonic() >= _profile_options[0]:
+        rows = db.session.query(Profile.id, Profile.name, Profile.is_default).order_by(Profile.is_default.desc(), Profile.name)
+        options = [{'id': pid, 'name': name, 'is_default': is_default} for pid, name, is_default in rows]
+        _profile_options = (time.monotonic() + PROFILE_OPTIONS_TTL, options)
+    return _profile_options[1]
+
+def _invalidate_profile_options():
+    global _profile_options
+    _profile_options = None
 
 # Main Routes
 @main.route('/')
 def index():
+    """
+    Library page. Pages are addressed by the id of the last (?after=) or first (?before=)
+    game on the neighbouring page, so each page is an index range scan with no OFFSET or COUNT.
+    """
+    args = request.args
     query = Game.query
 
-    filter_status = request.args.get('filter_status', 'all')
-    sort_by = request.args.get('sort_by', 'id_desc')
-    page = request.args.get('page', 1, type=int)
+    filter_status = args.get('filter_status', 'all')
+    sort_by = args.get('sort_by', 'id_desc')
+    if sort_by not in INDEX_SORTS:
+        sort_by = 'id_desc'
+    after_id = args.get('after', type=int)
+    before_id = args.get('before', type=int)
 
     if filter_status and filter_status != 'all':
         query = query.filter_by(status=filter_status)
 
-    if sort_by == 'title_asc':
-        query = query.order_by(Game.official_title.asc())
-    elif sort_by == 'release_date_desc':
-        query = query.order_by(Game.release_date.desc())
-    else: # Default case
-        query = query.order_by(Game.id.desc())
+    column, descending = INDEX_SORTS[sort_by]
+    forward = before_id is None
+    anchor_id = after_id if forward else before_id
+    anchor = db.session.query(column).filter(Game.id == anchor_id).first() if anchor_id else None
+    if anchor is None:
+        # No cursor, or the anchor game was deleted: start from the first page
+        forward, anchor_id = True, None
+    else:
+        query = query.filter(_keyset_condition(column, anchor[0], anchor_id, less_than=(descending == forward)))
+
+    # Walking backwards means reading the sort order in reverse and flipping the page afterwards
+    reverse_order = descending == forward
+    query = query.order_by(column.desc(), Game.id.desc()) if reverse_order else query.order_by(column.asc(), Game.id.asc())
+    games = query.limit(INDEX_PAGE_SIZE + 1).all()
+    has_more = len(games) > INDEX_PAGE_SIZE
+    games = games[:INDEX_PAGE_SIZE]
+    if not forward:
+        games.reverse()
+
+    has_prev = has_more if not forward else anchor_id is not None
+    has_next = has_more if forward else True
         
-    all_statuses = [s[0] for s in db.session.query(Game.status).distinct()]
+    all_statuses = _get_all_statuses()
 
-    pagination = query.paginate(page=page, per_page=25, error_out=False) # Using 25 per page is a good number
-    games = pagination.items
-    
     return render_template(
         'index.html', 
         games=games, 
-        pagination=pagination,
+        prev_cursor=games[0].id if games and has_prev else None,
+        next_cursor=games[-1].id if games and has_next else None,
         all_statuses=all_statuses,
         current_filter=filter_status,
         current_sort=sort_by
@@ -86,18 +172,35 @@ def add_game_search():
             flash("Please enter a game title to search.", "warning")
             return render_template('add_game_form.html')
         
+        # Back-pressure: refuse new searches rather than letting the queue grow unbounded.
+        # Only recent tasks count, so tasks orphaned by a crash can't block searching until the sweep expires them.
+        cutoff = datetime.utcnow() - timedelta(minutes=current_app.config['SEARCH_TASK_TIMEOUT_MINUTES'])
+        queued = SearchTask.query.filter(SearchTask.status.in_(['PENDING', 'RUNNING']), SearchTask.created_at >= cutoff).count()
+        if queued >= current_app.config['SEARCH_QUEUE_MAX_LEN']:
+            flash("Too many searches are already in progress. Please try again in a moment.", "warning")
+            return render_template('add_game_form.html'), 503
+
         task_id = str(uuid.uuid4())
         new_task = SearchTask(id=task_id, search_term=search_term)
         db.session.add(new_task)
         db.session.commit()
+        task_executor.submit(run_search_task, current_app._get_current_object(), task_id)
         return redirect(url_for('main.show_search_results', task_id=task_id))
     discover_lists = {}
-    cached_items = DiscoverCache.query.all()
-    for item in cached_items:
-        discover_lists[item.list_name] = json.loads(item.content)
+    rows = DiscoverCache.query.with_entities(DiscoverCache.list_name, DiscoverCache.updated_at).all()
+    for list_name, updated_at in rows:
+        cached = _decoded_discover_lists.get(list_name)
+        if cached is None or cached[0] != updated_at:
+            # Only pull and decode the content when the list was refreshed since we last saw it
+            content = db.session.query(DiscoverCache.content).filter_by(list_name=list_name).scalar()
+            cached = (updated_at, orjson.loads(content))
+            _decoded_discover_lists[list_name] = cached
+        discover_lists[list_name] = cached[1]
     
     return render_template('add_game_form.html', discover=discover_lists)    
 
+INDEXER_ID_RE = re.compile(r'/indexers/([^/]+)/results/torznab')
+
 def _parse_indexer_id_from_url(url):
     """
     Parses 'http://host/api/v2.0/indexers/THE_ID/results/torznab/'
@@ -105,50 +208,35 @@ def _parse_indexer_id_from_url(url):
     """
     if not url:
         return None
-    match = re.search(r'/indexers/([^/]+)/results/torznab', url)
+    match = INDEXER_ID_RE.search(url)
     return match.group(1) if match else None
 
 @main.route('/add/results/<task_id>')
 def show_search_results(task_id):
-    # --- THIS IS THE FIX ---
-
-    # 1. Query the database to get the Profile objects
-    profiles_query = Profile.query.order_by(Profile.is_default.desc(), Profile.name).all()
-    
-    # 2. Convert the list of objects into a list of dictionaries
-    profiles_data = [
-        {
-            'id': profile.id, 
-            'name': profile.name, 
-            'is_default': profile.is_default
-        } 
-        for profile in profiles_query
-    ]
-    
-    # 3. Pass the JSON-friendly list of dictionaries to the template
-    return render_template('add_game_results.html', task_id=task_id, profiles=profiles_data)
+    return render_template('add_game_results.html', task_id=task_id, profiles=_get_profile_options())
 
 @main.route('/add/results/data/<task_id>')
 def get_search_results_data(task_id):
     task = SearchTask.query.get(task_id)
     if task:
-        return jsonify({'status': task.status, 'results': json.loads(task.results or '[]')})
+        return jsonify({'status': task.status, 'results': orjson.loads(task.results or '[]')})
     return jsonify({'status': 'NOT_FOUND', 'results': []}), 404
 
 @main.route('/add/confirm', methods=['POST'])
 def add_game_confirm():
-    igdb_id = request.form.get('igdb_id')
+    form = request.form
+    igdb_id = form.get('igdb_id')
 
-    profile_id = request.form.get('profile_id')
+    profile_id = form.get('profile_id')
 
     if not igdb_id:
         flash("Invalid request. No game ID provided.", "error")
         return redirect(url_for('main.add_game_search'))
 
     # --- Duplicate Check ---
-    exists = Game.query.filter_by(igdb_id=igdb_id).first()
-    if exists:
-        flash(f"'{exists.official_title}' is already in your library.", "info")
+    existing_title = db.session.query(Game.official_title).filter_by(igdb_id=igdb_id).scalar()
+    if existing_title is not None:
+        flash(f"'{existing_title}' is already in your library.", "info")
         return redirect(url_for('main.index'))
 
     # --- Fetch Full Details from API ---
@@ -169,6 +257,7 @@ def add_game_confirm():
     
     db.session.add(new_game)
     db.session.commit()
+    task_executor.submit(run_release_check, current_app._get_current_object(), new_game.id)
 
     flash(f"'{new_game.official_title}' has been added and a release check has been queued.", "success")
     
@@ -177,11 +266,21 @@ def add_game_confirm():
 @main.route('/library/scan', methods=['POST'])
 def library_scan():
     """
-    Scans the library, parses folder names, and searches IGDB for matches.
-    Returns the results as JSON for the frontend to display.
+    Queues a library scan (parse folder names, search IGDB for matches) on the task
+    executor and returns its task id; the frontend polls library_scan_data for results.
     """
-    scan_results = process_library_scan()
-    return jsonify(scan_results)
+    task_id = str(uuid.uuid4())
+    db.session.add(ScanTask(id=task_id))
+    db.session.commit()
+    task_executor.submit(run_library_scan_task, current_app._get_current_object(), task_id)
+    return jsonify({'task_id': task_id}), 202
+
+@main.route('/library/scan/data/<task_id>')
+def library_scan_data(task_id):
+    task = db.session.get(ScanTask, task_id)
+    if task:
+        return jsonify({'status': task.status, 'results': orjson.loads(task.results or '[]')})
+    return jsonify({'status': 'NOT_FOUND', 'results': []}), 404
 
     
 @main.route('/library/import/confirm', methods=['POST'])
@@ -194,10 +293,10 @@ def library_import_confirm():
     igdb_id = str(data.get('igdb_id'))
     original_folder_name = data.get('folder_name')
 
-    exists = Game.query.filter(
+    exists = db.session.query(Game.query.filter(
         (Game.igdb_id == igdb_id) | 
         (Game.local_path == original_folder_name)
-    ).first()
+    ).exists()).scalar()
     if exists:
         return jsonify({'error': 'Game already exists in the database.'}), 409
 
@@ -208,7 +307,7 @@ def library_import_confirm():
     library_path = Path(current_app.config['LIBRARY_PATH'])
     original_path = library_path / original_folder_name
     
-    clean_title = "".join(c for c in game_details['official_title'] if c.isalnum() or c in (' ', '.', '-')).rstrip()
+    clean_title = _safe_folder_name(game_details['official_title'])
     new_parent_path = library_path / clean_title
 
     # --- THIS IS THE NEW, SMARTER LOGIC ---
@@ -263,7 +362,8 @@ def library_import_confirm():
 # Manual Search & Download Routes
 @main.route('/search/<int:game_id>', methods=['GET', 'POST'])
 def interactive_search(game_id):
-    game = Game.query.get_or_404(game_id)
+    # Only the title fields are used here; skip the summary/media text columns
+    game = Game.query.options(load_only(Game.official_title, Game.release_name)).filter_by(id=game_id).first_or_404()
     
     additional_release_id = request.args.get('additional_release_id', type=int)
 
@@ -289,26 +389,35 @@ def interactive_search(game_id):
 
 @main.route('/download', methods=['POST'])
 def download():
-    game_id = request.form['game_id']
-    magnet_link = request.form['magnet_link']
-    additional_release_id = request.form.get('additional_release_id', type=int)
+    form = request.form
+    game_id = form['game_id']
+    magnet_link = form['magnet_link']
+    additional_release_id = form.get('additional_release_id', type=int)
 
     torrent_hash = add_to_qbittorrent(magnet_link)
     
     if torrent_hash:
+        # Single UPDATE ... RETURNING per download instead of loading the row first
         if additional_release_id:
             # This is an addon download
-            addon = AdditionalRelease.query.get(additional_release_id)
-            if addon:
-                addon.status = 'Snatched'
-                addon.torrent_hash = torrent_hash
-                flash(f"Addon '{addon.release_name}' has been snatched.", "success")
+            addon_name = db.session.execute(
+                update(AdditionalRelease).where(AdditionalRelease.id == additional_release_id)
+                .values(status='Snatched', torrent_hash=torrent_hash)
+                .returning(AdditionalRelease.release_name)
+            ).scalar()
+            if addon_name:
+                flash(f"Addon '{addon_name}' has been snatched.", "success")
         else:
             # This is a base game download
-            game = Game.query.get_or_404(game_id)
-            game.status = 'Snatched'
-            game.torrent_hash = torrent_hash
-            flash(f"'{game.official_title}' has been snatched.", "success")
+            game_title = db.session.execute(
+                update(Game).where(Game.id == game_id)
+                .values(status='Snatched', torrent_hash=torrent_hash)
+                .returning(Game.official_title)
+            ).scalar()
+            if game_title is None:
+                abort(404)
+            remember_torrent_title(torrent_hash, game_title)
+            flash(f"'{game_title}' has been snatched.", "success")
         
         db.session.commit()
 
@@ -341,6 +450,7 @@ def manual_scan_game(game_id):
     # Set the flag for the background processor to pick up
     game.needs_release_check = True
     db.session.commit()
+    task_executor.submit(run_release_check, current_app._get_current_object(), game.id)
     
     flash(f"A manual release scan for '{game.official_title}' has been queued.", "success")
     return jsonify({'success': True, 'message': f"Scan queued for {game.official_title}"})
@@ -354,58 +464,54 @@ def get_game_status_api(game_id):
     return jsonify({'status': game.status})
 
 # Settings Routes
+SECRET_SETTING_KEYS = ('twitch_client_secret', 'qbittorrent_pass', 'jackett_api_key')
+
 @main.route('/settings', methods=['GET'])
 def settings():
-    settings_data = {s.key: s.value for s in Setting.query.all()}
-    # Redact secret fields before sending to the template
-    for key in ['twitch_client_secret', 'qbittrent_pass', 'jackett_api_key']:
+    settings_data = get_settings_dict()
+    # Redact secret fields before sending to the template (settings_data is our own copy)
+    for key in SECRET_SETTING_KEYS:
         if settings_data.get(key):
             settings_data[key] = '••••••••'
             
-    indexers = Indexer.query.order_by(Indexer.name).all()
+    # Plain rows with just the columns settings.html renders
+    indexers = db.session.query(Indexer.id, Indexer.name, Indexer.indexer_id, Indexer.enabled).order_by(Indexer.name).all()
     
     # --- NEW: Fetch profiles to display in the UI ---
-    profiles = Profile.query.order_by(Profile.name).all()
+    profiles = db.session.query(
+        Profile.id, Profile.name, Profile.release_types, Profile.preferred_groups,
+        Profile.avoided_groups, Profile.delay_hours, Profile.is_default
+    ).order_by(Profile.name).all()
     
     return render_template('settings.html', settings=settings_data, indexers=indexers, profiles=profiles)
 
 @main.route('/settings/save', methods=['POST'])
 def save_settings():
-    new_default_id = request.form.get('default_profile')
+    form = request.form
+    new_default_id = form.get('default_profile')
     
-    if new_default_id:
-        # First, unset the current default
-        current_default = Profile.query.filter_by(is_default=True).first()
-        if current_default:
-            current_default.is_default = False
-        
-        # Then, set the new default
-        new_default = Profile.query.get(new_default_id)
-        if new_default:
-            new_default.is_default = True
-    auto_download_enabled = 'true' if 'auto_download_enabled' in request.form else 'false'
-    setting = Setting.query.get('auto_download_enabled')
-    if setting:
-        setting.value = auto_download_enabled
-    else:
-        db.session.add(Setting(key='auto_download_enabled', value=auto_download_enabled))
+    if new_default_id and db.session.query(Profile.query.filter_by(id=new_default_id).exists()).scalar():
+        # Flip every profile's flag in one statement: only the chosen profile stays default
+        db.session.execute(update(Profile).values(is_default=(Profile.id == int(new_default_id))))
+    auto_download_enabled = 'true' if 'auto_download_enabled' in form else 'false'
+    rows = [{'key': 'auto_download_enabled', 'value': auto_download_enabled}]
 
     # This function now only saves non-indexer settings
-    for key, value in request.form.items():
+    for key, value in form.items():
         # Skip the checkbox we just handled
         if key == 'auto_download_enabled':
             continue
         # Do not save placeholder values for secrets
         if value == '••••••••':
             continue
-            
-        setting = Setting.query.get(key)
-        if setting:
-            setting.value = value
-        else:
-            db.session.add(Setting(key=key, value=value))
-            
+        rows.append({'key': key, 'value': value})
+
+    # One INSERT ... ON CONFLICT statement instead of a SELECT + INSERT/UPDATE per key
+    stmt = _dialect_insert(Setting).values(rows)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=[Setting.key], set_={'value': stmt.excluded.value}))
     db.session.commit()
+    _invalidate_profile_options()
+    invalidate_settings_cache()
     flash("Global settings saved successfully!", "success")
     return redirect(url_for('main.settings'))
 
@@ -447,6 +553,13 @@ def delete_indexer(indexer_id):
 
 
 # NEW PROFILE MANAGEMENT ROUTES
+# One comma-separated group name, without surrounding whitespace
+GROUP_NAME_RE = re.compile(r'[^,\s](?:[^,]*[^,\s])?')
+
+def _parse_groups(group_string):
+    """Splits 'FitGirl, DODI ,FLT' into ['FitGirl', 'DODI', 'FLT'], dropping empty entries."""
+    return GROUP_NAME_RE.findall(group_string)
+
 @main.route('/settings/profile/add', methods=['POST'])
 def add_profile():
     data = request.get_json()
@@ -457,21 +570,18 @@ def add_profile():
     if Profile.query.filter_by(name=name).first():
         return jsonify({'error': f"A profile named '{name}' already exists."}), 409
 
-    # Helper to clean and split comma-separated strings
-    def parse_groups(group_string):
-        return [g.strip() for g in group_string.split(',') if g.strip()]
-
     is_first_profile = Profile.query.first() is None
     new_profile = Profile(
         name=name,
         release_types=json.dumps(data.get('release_types', [])),
-        preferred_groups=json.dumps(parse_groups(data.get('preferred_groups', ''))),
-        avoided_groups=json.dumps(parse_groups(data.get('avoided_groups', ''))),
+        preferred_groups=json.dumps(_parse_groups(data.get('preferred_groups', ''))),
+        avoided_groups=json.dumps(_parse_groups(data.get('avoided_groups', ''))),
         delay_hours=int(data.get('delay_hours', 0)),
         is_default=is_first_profile
     )
     db.session.add(new_profile)
     db.session.commit()
+    _invalidate_profile_options()
     flash(f"Profile '{name}' added successfully.", "success")
     return jsonify({'success': True}), 201
 
@@ -489,16 +599,14 @@ def edit_profile(profile_id):
     if existing:
         return jsonify({'error': f"A profile named '{new_name}' already exists."}), 409
 
-    def parse_groups(group_string):
-        return [g.strip() for g in group_string.split(',') if g.strip()]
-
     profile.name = new_name
     profile.release_types = json.dumps(data.get('release_types', []))
-    profile.preferred_groups = json.dumps(parse_groups(data.get('preferred_groups', '')))
-    profile.avoided_groups = json.dumps(parse_groups(data.get('avoided_groups', '')))
+    profile.preferred_groups = json.dumps(_parse_groups(data.get('preferred_groups', '')))
+    profile.avoided_groups = json.dumps(_parse_groups(data.get('avoided_groups', '')))
     profile.delay_hours = int(data.get('delay_hours', 0))
     
     db.session.commit()
+    _invalidate_profile_options()
     flash(f"Profile '{profile.name}' updated successfully.", "success")
     return jsonify({'success': True})
 
@@ -514,6 +622,7 @@ def delete_profile(profile_id):
         
     db.session.delete(profile)
     db.session.commit()
+    _invalidate_profile_options()
     flash(f"Profile '{profile_name}' deleted.", "success")
     return jsonify({'success': True})
 
@@ -522,78 +631,124 @@ def delete_profile(profile_id):
 def activity_page():
     return render_template('activity.html')
 
+def _build_activity_payload():
+    """Fetches the tracked torrents from qBittorrent and formats them for the activity page."""
+    client = get_qbit_client()
+    category = get_settings_dict().get('qbittorrent_category')
+    # qBittorrent sorts by the raw progress float for us
+    torrents_info = client.torrents_info(category=category, sort='progress', reverse=True) if category else []
+    
+    # Only look up titles for the torrents qBittorrent actually returned
+    hash_to_title = get_titles_for_hashes([t.hash for t in torrents_info])
+    
+    # Raw numbers only; activity.html formats sizes, speeds and durations in the browser
+    torrents_data = []
+    now = time.time()
+    for t in torrents_info:
+        seeding_seconds = None
+        # Check if the torrent is seeding and has a completion date
+        if t.state in SEEDING_STATES and t.completion_on > 0:
+            seeding_seconds = int(now - t.completion_on)
+
+        torrents_data.append({
+            'hash': t.hash,
+            'name': t.name,
+            'friendly_name': hash_to_title.get(t.hash, t.name),
+            'torrent_name': t.name,
+            'state': t.state.upper(),
+            'progress': t.progress,
+            'size': t.size,
+            'ratio': t.ratio,
+            'dlspeed': t.dlspeed,
+            'upspeed': t.upspeed,
+            'seeding_seconds': seeding_seconds
+        })
+    return {'torrents': torrents_data}
+
+def _invalidate_activity_snapshot():
+    global _activity_snapshot, _activity_generation
+    with _activity_lock:
+        _activity_snapshot = None
+        _activity_generation += 1
+
 @main.route('/activity/data')
 def activity_data():
+    """
+    Serves the activity payload from a short-lived shared snapshot, so every open
+    activity tab polling at once costs one qBittorrent call per worker, not one each.
+    """
+    global _activity_snapshot, _activity_refreshing
     try:
-        client = get_qbit_client()
-        settings = {s.key: s.value for s in Setting.query.all()}
-        category = settings.get('qbittorrent_category')
-        torrents_info = client.torrents_info(category=category) if category else []
-        
-        hash_to_title = {g.torrent_hash: g.official_title for g in Game.query.filter(Game.torrent_hash.isnot(None)).all()}
-        
-        torrents_data = []
-        for t in torrents_info:
-            seeding_time_str = ""
-            # Check if the torrent is seeding and has a completion date
-            if t.state in ['uploading', 'stalledUP', 'checkingUP', 'forcedUP'] and t.completion_on > 0:
-                seeding_duration = time.time() - t.completion_on
-                seeding_time_str = format_seconds(seeding_duration)
-
-            torrents_data.append({
-                'hash': t.hash,
-                'name': t.name,
-                'friendly_name': hash_to_title.get(t.hash, t.name),
-                'torrent_name': t.name,
-                'state': t.state.upper(),
-                'progress': f"{t.progress * 100:.1f}%",
-                'size': format_bytes(t.size),
-                'ratio': f"{t.ratio:.2f}",
-                'dlspeed': f"{format_bytes(t.dlspeed)}/s",
-                'upspeed': f"{format_bytes(t.upspeed)}/s",
-                # --- NEW FIELD FOR SEEDING TIME ---
-                'seeding_time': seeding_time_str
-            })
-
-        return jsonify({'torrents': sorted(torrents_data, key=lambda x: x['progress'], reverse=True)})
+        # The lock only guards the snapshot swap; qBittorrent is called outside it, so a slow
+        # qBit never queues every poll thread. While one poll refreshes, the others get the stale body.
+        with _activity_lock:
+            snapshot = _activity_snapshot
+            if snapshot is not None and (time.monotonic() < snapshot[0] or _activity_refreshing):
+                return Response(snapshot[1], mimetype='application/json')
+            _activity_refreshing = True
+            generation = _activity_generation
+
+        try:
+            # The snapshot holds the already-serialized body, so polls within the TTL skip encoding too
+            body = orjson.dumps(_build_activity_payload())
+            with _activity_lock:
+                if generation == _activity_generation:
+                    _activity_snapshot = (time.monotonic() + ACTIVITY_SNAPSHOT_TTL, body)
+        finally:
+            with _activity_lock:
+                _activity_refreshing = False
+        return Response(body, mimetype='application/json')
     except Exception as e:
         current_app.logger.error(f"Error fetching activity data: {e}")
         return jsonify({'error': str(e)}), 500
 
 @main.route('/activity/action', methods=['POST'])
 def activity_action():
-    tor_hash = request.form.get('hash')
-    action = request.form.get('action')
+    form = request.form
+    tor_hash = form.get('hash')
+    action = form.get('action')
     client = get_qbit_client()
     
     if action == 'pause': client.torrents_pause(torrent_hashes=tor_hash)
     elif action == 'resume': client.torrents_resume(torrent_hashes=tor_hash)
     elif action == 'delete':
-        delete_files = request.form.get('delete_files') == 'true'
+        delete_files = form.get('delete_files') == 'true'
         client.torrents_delete(delete_files=delete_files, torrent_hashes=tor_hash)
-        game = Game.query.filter_by(torrent_hash=tor_hash).first()
-        if game:
-            game.status = 'Cracked'
-            game.torrent_hash = None
-            db.session.commit()
+        forget_torrent_title(tor_hash)
+        # Release the game (if any) that owned this torrent without loading it
+        db.session.execute(update(Game).where(Game.torrent_hash == tor_hash).values(status='Cracked', torrent_hash=None))
+        db.session.commit()
+    _invalidate_activity_snapshot()
             
     return redirect(url_for('main.activity_page'))
 
 # Game & File Routes
 @main.route('/game/delete/<int:game_id>', methods=['POST'])
 def delete_game(game_id):
-    game = Game.query.get_or_404(game_id)
-    db.session.delete(game)
+    torrent_hash = db.session.query(Game.torrent_hash).filter_by(id=game_id).scalar()
+    if torrent_hash:
+        forget_torrent_title(torrent_hash)
+    # Bulk deletes skip the ORM cascade, so remove the child rows explicitly
+    AlternativeRelease.query.filter_by(game_id=game_id).delete(synchronize_session=False)
+    AdditionalRelease.query.filter_by(game_id=game_id).delete(synchronize_session=False)
+    if not Game.query.filter_by(id=game_id).delete(synchronize_session=False):
+        db.session.rollback()
+        abort(404)
     db.session.commit()
     return redirect(url_for('main.index'))
 
 @main.route('/game/<int:game_id>')
 def game_detail(game_id):
     """Displays the detailed page for a single game."""
-    game = Game.query.get_or_404(game_id)
+    # Load both release lists up front rather than lazily while the template renders
+    game = Game.query.options(
+        selectinload(Game.alternative_releases),
+        selectinload(Game.additional_releases)
+    ).filter_by(id=game_id).first_or_404()
     
     # --- NEW: Fetch all profiles to populate the dropdown ---
-    profiles = Profile.query.order_by(Profile.name).all()
+    # The dropdown only needs id/name; game.profile_id is compared directly, so game.profile is never loaded
+    profiles = db.session.query(Profile.id, Profile.name).order_by(Profile.name).all()
     
     return render_template('game_detail.html', game=game, profiles=profiles)
 
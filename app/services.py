@@ -4,7 +4,6 @@
 import os
 import PTN
 import re
-import json
 import time
 from datetime import datetime
 import urllib.parse
@@ -12,10 +11,16 @@ import subprocess
 import sys
 import html
 import shutil
+import threading
+from collections import deque, defaultdict
+from dataclasses import dataclass
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from operator import itemgetter
+from functools import lru_cache
 
 # --- Third-Party Library Imports ---
 import requests
-import praw
+import orjson
 import feedparser
 from qbittorrentapi import Client, exceptions
 from flask import current_app
@@ -24,52 +29,250 @@ import unicodedata
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
 from pathlib import Path
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.sql import func
 
 # --- Local Application Imports ---
 from . import db
 from .models import Game, Setting, DiscoverCache, AlternativeRelease, AdditionalRelease, Indexer
+from .util import timestamp_to_date_filter, ForkSafeExecutor
 
 # --- NEW: Global cache for the IGDB token ---
 _igdb_access_token = None
 _igdb_token_expires = 0
+_igdb_token_lock = threading.Lock()
+
+# --- Short-lived cache for get_settings_dict (settings only change from the settings page) ---
+SETTINGS_CACHE_TTL = 60
+_settings_cache = None
+_settings_cache_expires = 0
+_settings_lock = threading.Lock()
+
+# --- Per-host rate limiting for outbound HTTP calls ---
+# (max_calls, period_seconds). Hosts not listed here use DEFAULT_RATE_LIMIT.
+HOST_RATE_LIMITS = {
+    'api.igdb.com': (4, 1),   # IGDB allows 4 requests per second
+    'api.predb.net': (1, 1),  # Be polite; predb.net is hit for every release and NFO
+}
+DEFAULT_RATE_LIMIT = (4, 1)
+
+class _RateLimiter:
+    """A sliding-window limiter allowing at most max_calls per period seconds."""
+
+    def __init__(self, max_calls, period):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            while self._calls and now - self._calls[0] >= self.period:
+                self._calls.popleft()
+            if len(self._calls) >= self.max_calls:
+                time.sleep(self.period - (now - self._calls[0]))
+                now = time.monotonic()
+                self._calls.popleft()
+            self._calls.append(now)
+
+class _TTLCache:
+    """A small thread-safe dict whose entries expire after ttl seconds; cleared when full."""
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[0]:
+                del self._data[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._data) >= self.maxsize:
+                self._data.clear()
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def _throttle(url):
+    """Blocks until a request to the URL's host is allowed by its rate limit."""
+    host = urllib.parse.urlsplit(url).hostname or ''
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(host)
+        if limiter is None:
+            limiter = _rate_limiters[host] = _RateLimiter(*HOST_RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT))
+    limiter.wait()
+
+def _build_http_session():
+    """
+    One pooled session for all outbound HTTP so IGDB, Twitch, predb, xREL and FitGirl
+    calls reuse keep-alive connections instead of a new TCP+TLS handshake each time.
+    """
+    retry_strategy = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry_strategy)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({'User-Agent': 'Gamearr/1.1'})
+    return session
+
+_http_session = _build_http_session()
+
+# Upper bound for waiting on a pooled HTTP job: a 15s request timeout plus three
+# retries with backoff stays well under it, so hitting it means the job is stuck
+POOLED_RESULT_TIMEOUT = 120
+
+def _http_get(url, **kwargs):
+    """GET through the shared session, with per-host rate limiting."""
+    _throttle(url)
+    return _http_session.get(url, **kwargs)
+
+def _http_post(url, **kwargs):
+    """POST through the shared session, with per-host rate limiting."""
+    _throttle(url)
+    return _http_session.post(url, **kwargs)
+
+def _fetch_feed(url, timeout=15):
+    """
+    Opens an RSS/Torznab feed through the shared session and returns the streaming
+    response; pass response.raw to feedparser and close the response afterwards.
+    """
+    response = _http_get(url, stream=True, timeout=timeout)
+    response.raise_for_status()
+    response.raw.decode_content = True
+    return response
+
+# --- IGDB search cache ---
+# Searches are repeated while a user refines a query or re-opens the add page.
+IGDB_SEARCH_TTL = 3600
+_igdb_search_cache = _TTLCache(ttl=IGDB_SEARCH_TTL, maxsize=256)
+
+IGDB_SEARCH_FIELDS = 'name, cover.url, first_release_date, slug'
+IGDB_MULTIQUERY_URL = 'https://api.igdb.com/v4/multiquery'
+IGDB_MULTIQUERY_LIMIT = 10  # IGDB accepts at most 10 queries per multiquery request
+
+@dataclass(slots=True)
+class IgdbHit:
+    """One lightweight IGDB search result. orjson serializes these directly."""
+    id: int
+    name: str
+    slug: str
+    cover_url: str
+    release_timestamp: int | None
+
+def _clean_igdb_search_results(results):
+    hits = []
+    for game in results:
+        cover = game.get('cover')
+        cover_url = cover.get('url', '').replace('t_thumb', 't_cover_big') if cover else ''
+        hits.append(IgdbHit(game.get('id'), game.get('name'), game.get('slug'), cover_url, game.get('first_release_date')))
+    return hits
+
+# Multiquery windows for big library imports run side by side; the IGDB rate limiter
+# in _throttle still caps them at HOST_RATE_LIMITS['api.igdb.com']
+_igdb_executor = ForkSafeExecutor(max_workers=4, thread_name_prefix='igdb-search')
+
+def _search_igdb_window(titles):
+    """One multiquery POST for up to IGDB_MULTIQUERY_LIMIT titles. Returns {title: results}."""
+    escaped_titles = [title.replace('"', '\\"') for title in titles]
+    query_body = ''.join(
+        f'query games "{i}" {{ search "{title}"; fields {IGDB_SEARCH_FIELDS}; limit 20; }};'
+        for i, title in enumerate(escaped_titles)
+    )
+    response = _igdb_post(IGDB_MULTIQUERY_URL, query_body, timeout=15)
+    response.raise_for_status()
+    results_by_name = {block.get('name'): block.get('result', []) for block in response.json()}
+    return {title: _clean_igdb_search_results(results_by_name.get(str(i), [])) for i, title in enumerate(titles)}
+
+def search_igdb_batch(titles):
+    """
+    Performs LIGHTWEIGHT IGDB searches for several titles at once and returns
+    {title: results}. Cached titles are served locally; the rest are sent to the
+    multiquery endpoint IGDB_MULTIQUERY_LIMIT at a time, one POST per window,
+    with multiple windows in flight concurrently.
+    """
+    found = {}
+    misses = []
+    for title in dict.fromkeys(titles):
+        cached = _igdb_search_cache.get(title)
+        if cached is not None:
+            found[title] = list(cached)
+        else:
+            misses.append(title)
+
+    windows = [misses[start:start + IGDB_MULTIQUERY_LIMIT] for start in range(0, len(misses), IGDB_MULTIQUERY_LIMIT)]
+    futures = [None] * len(windows)
+    if len(windows) > 1:
+        app = current_app._get_current_object()
+
+        def _run(window):
+            with app.app_context():
+                return _search_igdb_window(window)
+
+        futures = [_igdb_executor.submit(_run, window) for window in windows]
+
+    for window, future in zip(windows, futures):
+        try:
+            window_results = future.result(timeout=POOLED_RESULT_TIMEOUT) if future else _search_igdb_window(window)
+        except Exception as e:
+            current_app.logger.error(f"Error searching IGDB for {window}: {e}")
+            found.update((title, []) for title in window)
+            continue
+
+        for title, cleaned_results in window_results.items():
+            _igdb_search_cache.set(title, cleaned_results)
+            found[title] = list(cleaned_results)
+    return found
 
 def search_igdb(search_term):
     """
     Performs a LIGHTWEIGHT search on IGDB, fetching only the data
-    needed for the search results page.
+    needed for the search results page. Successful searches are cached
+    for IGDB_SEARCH_TTL seconds.
     """
-    try:
-        # --- REFACTORED ---
-        headers = _get_igdb_headers()
-        
-        igdb_url = 'https://api.igdb.com/v4/games'
-        query_body = f'search "{search_term}"; fields name, cover.url, first_release_date, slug; limit 20;'
-        
-        response = requests.post(igdb_url, headers=headers, data=query_body, timeout=10)
-        response.raise_for_status()
-        
-        results = response.json()
-        cleaned_results = [
-            {
-                'id': game.get('id'),
-                'name': game.get('name'),
-                'slug': game.get('slug'),
-                'cover_url': game.get('cover', {}).get('url', '').replace('t_thumb', 't_cover_big'),
-                'release_timestamp': game.get('first_release_date')
-            } for game in results
-        ]
-        return cleaned_results
-    except Exception as e:
-        current_app.logger.error(f"Error searching IGDB for '{search_term}': {e}")
-        return []
+    return search_igdb_batch([search_term])[search_term]
+
+# --- IGDB game details cache ---
+# The same game is often looked up more than once across search -> confirm/import.
+IGDB_DETAILS_TTL = 3600
+_igdb_details_cache = _TTLCache(ttl=IGDB_DETAILS_TTL, maxsize=256)
 
 def get_igdb_game_details(igdb_id):
+    """
+    Returns the full dataset for a single game, served from an in-process cache for
+    IGDB_DETAILS_TTL seconds. Failed lookups (None) are not cached.
+    """
+    key = str(igdb_id)
+    cached = _igdb_details_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    game_details = _fetch_igdb_game_details(igdb_id)
+    if game_details:
+        _igdb_details_cache.set(key, game_details)
+        return dict(game_details)
+    return game_details
+
+def _fetch_igdb_game_details(igdb_id):
     """
     Fetches the full, rich dataset for a SINGLE game from IGDB using its ID.
     """
     try:
-        headers = _get_igdb_headers()
-        
         igdb_url = 'https://api.igdb.com/v4/games'
         
         query_body = (
@@ -78,7 +281,7 @@ def get_igdb_game_details(igdb_id):
             f'where id = {igdb_id};'
         )
         
-        response = requests.post(igdb_url, headers=headers, data=query_body, timeout=10)
+        response = _igdb_post(igdb_url, query_body, timeout=10)
         response.raise_for_status()
         
         results = response.json()
@@ -98,26 +301,13 @@ def get_igdb_game_details(igdb_id):
             'screenshots_urls': ",".join([s['url'].replace('t_thumb', 't_screenshot_med') for s in game.get('screenshots', [])]),
             'videos_urls': ",".join([f"https://www.youtube.com/watch?v={v['video_id']}" for v in game.get('videos', [])]),
             'cover_url': game.get('cover', {}).get('url', '').replace('t_thumb', 't_cover_big'),
-            'release_date': current_app.jinja_env.filters['timestamp_to_date'](game.get('first_release_date'))
+            'release_date': timestamp_to_date_filter(game.get('first_release_date'))
         }
         return game_details
     except Exception as e:
         current_app.logger.error(f"Error getting IGDB details for ID {igdb_id}: {e}")
         return None
 
-def _format_bytes(size_in_bytes):
-    """Formats bytes into a human-readable string (KB, MB, GB)."""
-    if size_in_bytes is None:
-        return "N/A"
-    size = float(size_in_bytes)
-    power = 1024
-    n = 0
-    power_labels = {0: '', 1: 'KB', 2: 'MB', 3: 'GB', 4: 'TB'}
-    while size > power and n < len(power_labels) -1 :
-        size /= power
-        n += 1
-    return f"{size:.2f} {power_labels[n]}"
-
 def _safe_timestamp_convert(ts):
     """Safely converts a value to an integer timestamp."""
     if not ts:
@@ -133,7 +323,7 @@ def _search_predb_net(search_term):
     try:
         safe_search = search_term.replace(':', '')
         params = {'type': 'search', 'q': safe_search, 'section': 'GAMES', 'sort': 'DESC'}
-        response = requests.get("https://api.predb.net/", params=params, timeout=10)
+        response = _http_get("https://api.predb.net/", params=params, timeout=10)
         response.raise_for_status()
         results = response.json().get('data', [])
         current_app.logger.info(f"       --> Found {len(results)} releases on predb.net.")
@@ -151,7 +341,7 @@ def _search_predb_club(search_term):
     try:
         filtered_search = f"{search_term} @cat GAMES"
         url = f"https://predb.club/api/v1/?q={urllib.parse.quote_plus(filtered_search)}"
-        response = requests.get(url, timeout=10)
+        response = _http_get(url, timeout=10)
         response.raise_for_status()
         json_data = response.json()
         if json_data.get('status') != 'success': return []
@@ -165,24 +355,44 @@ def _search_predb_club(search_term):
         current_app.logger.error(f"    -> ERROR checking predb.club: {e}")
         return []
 
+# --- Title matching patterns, compiled once at import ---
+PUNCTUATION_RE = re.compile(r'[^\w\s]')
+ROMAN_NUMERAL_RE = re.compile(r'\b(II|III|IV|V|VI|VII|VIII|IX|X)\b')
+FITGIRL_TITLE_RE = re.compile(r'<h1 class="entry-title"><a href=".+?" rel="bookmark">(.+?)</a></h1>')
+
+# Scene names separate words with '.', '_' or '-'; one C-level pass turns them into spaces
+RELEASE_WORD_SEPARATORS = str.maketrans('._-', '   ')
+SEARCH_TERM_SEPARATORS = str.maketrans('._', '  ')  # keeps the '-GROUP' suffix intact
+
+# re's \w is exactly str.isalnum() plus '_', so these match the old per-character filters
+UNSAFE_FILENAME_RE = re.compile(r'[^\w-]')           # keeps letters, digits, '_' and '-'
+UNSAFE_FOLDER_NAME_RE = re.compile(r'[^\w .-]|_')    # keeps letters, digits, ' ', '.' and '-'
+
+def _safe_folder_name(title):
+    """Strips characters that don't belong in a library folder name."""
+    return UNSAFE_FOLDER_NAME_RE.sub('', title).rstrip()
+
+# Common gaming words that don't affect matching
+SIMILARITY_IGNORED_WORDS = frozenset({
+    'repack', 'multi', 'multilingual', 'campaign', 'kampagne',
+    'complete', 'edition', 'goty', 'deluxe', 'ultimate', 'directors',
+    'cut', 'enhanced', 'definitive', 'special', 'collectors',
+    '2022', '2023', '2024', '2025', 'multi2', 'multi8', 'multi4',
+    'xx', 'x'
+})
+
 def _calculate_title_similarity(game_title, release_name):
     """Calculate similarity score between game title and release name."""
     
     # First replace dots, underscores, and dashes with spaces, THEN remove other punctuation
-    normalized_game = re.sub(r'[._-]', ' ', game_title)
-    normalized_release = re.sub(r'[._-]', ' ', release_name)
+    normalized_game = game_title.translate(RELEASE_WORD_SEPARATORS)
+    normalized_release = release_name.translate(RELEASE_WORD_SEPARATORS)
     
     # Now remove remaining punctuation and split into words
-    game_words = set(re.sub(r'[^\w\s]', '', normalized_game.lower()).split())
-    release_words = set(re.sub(r'[^\w\s]', '', normalized_release.lower()).split())
+    game_words = set(PUNCTUATION_RE.sub('', normalized_game.lower()).split())
+    release_words = set(PUNCTUATION_RE.sub('', normalized_release.lower()).split())
     
-    # Remove common gaming words that don't affect matching
-    common_words = {'repack', 'multi', 'multilingual', 'campaign', 'kampagne', 
-                   'complete', 'edition', 'goty', 'deluxe', 'ultimate', 'directors',
-                   'cut', 'enhanced', 'definitive', 'special', 'collectors', 
-                   '2022', '2023', '2024', '2025', 'multi2', 'multi8', 'multi4',
-                   'xx', 'x'}
-    release_words -= common_words
+    release_words -= SIMILARITY_IGNORED_WORDS
     
     # Calculate overlap score
     if not game_words or not release_words:
@@ -200,19 +410,17 @@ def _refine_search_term(raw_release_name):
     if not raw_release_name:
         return ""
     
-    # Replace common separators (underscores, periods) with spaces
-    cleaned = raw_release_name.replace('.', ' ').replace('_', ' ')
-    
-    # Collapse multiple spaces into one and trim whitespace from the ends
-    return re.sub(r'\s+', ' ', cleaned).strip()
+    # Replace common separators (underscores, periods) with spaces, then
+    # collapse multiple spaces into one and trim whitespace from the ends
+    return ' '.join(raw_release_name.translate(SEARCH_TERM_SEPARATORS).split())
 
 def _is_valid_game_match(game_title, release_name, min_similarity=0.7):
     """Check if release name is a valid match for the game title."""
     similarity = _calculate_title_similarity(game_title, release_name)
     
     # Special handling for numbered sequels (II, III, IV, etc.)
-    game_roman = re.search(r'\b(II|III|IV|V|VI|VII|VIII|IX|X)\b', game_title)
-    release_roman = re.search(r'\b(II|III|IV|V|VI|VII|VIII|IX|X)\b', release_name)
+    game_roman = ROMAN_NUMERAL_RE.search(game_title)
+    release_roman = ROMAN_NUMERAL_RE.search(release_name)
     
     if game_roman and release_roman:
         # For numbered sequels, roman numerals must match exactly
@@ -231,7 +439,7 @@ def check_source_xrel(search_term):
     try:
         safe_search = search_term.replace(':', '')
         url = f"https://api.xrel.to/v2/search/releases.xml?q={urllib.parse.quote_plus(safe_search)}&scene=1&p2p=1"
-        response = requests.get(url, timeout=15)
+        response = _http_get(url, timeout=15)
         response.raise_for_status()
         root = ET.fromstring(response.content)
         for rls in root.findall('.//rls') + root.findall('.//p2p_rls'):
@@ -254,13 +462,13 @@ def check_source_fitgirl(game_title):
         base_url = "https://fitgirl-repacks.site/"
         encoded_search = urllib.parse.quote_plus(game_title)
         
-        response = requests.get(f"{base_url}?s={encoded_search}", timeout=15)
+        response = _http_get(f"{base_url}?s={encoded_search}", timeout=15)
         response.raise_for_status()
 
         if "Sorry, but nothing matched your search terms." in response.text:
             return None
         
-        matches = re.findall(r'<h1 class="entry-title"><a href=".+?" rel="bookmark">(.+?)</a></h1>', response.text)
+        matches = FITGIRL_TITLE_RE.findall(response.text)
         
         for found_title in matches:
             # Use the improved matching logic instead of simple substring check
@@ -274,7 +482,142 @@ def check_source_fitgirl(game_title):
         current_app.logger.error(f"    -> ERROR: FitGirl check failed: {e}")
         return None
 
+# Jackett searches hit every enabled indexer and can take seconds; reuse recent results
+JACKETT_RESULTS_TTL = 300
+_jackett_results_cache = _TTLCache(ttl=JACKETT_RESULTS_TTL, maxsize=256)
+
 def search_jackett(game_title):
+    """
+    Searches Jackett, returning cached results for the same term from the last
+    JACKETT_RESULTS_TTL seconds. Empty results are not cached.
+    """
+    cached = _jackett_results_cache.get(game_title)
+    if cached is not None:
+        return list(cached)
+    results = _search_jackett_uncached(game_title)
+    if results:
+        _jackett_results_cache.set(game_title, results)
+    return list(results)
+
+TORZNAB_NS = '{http://torznab.com/schemas/2015/feed}'
+
+# Indexers disagree on attribute names; the first one present wins
+TORZNAB_SEEDER_KEYS = ('seeders', 'seeds', 'seeder')
+TORZNAB_LEECHER_KEYS = ('leechers', 'leeches', 'leech')
+TORZNAB_PEER_KEYS = ('peers', 'peer')
+
+def _safe_int(value, default=0):
+    try: return int(value) if value is not None else default
+    except (ValueError, TypeError): return default
+
+def _first_attr(attributes, keys):
+    """Returns the value of the first key present in attributes, or None."""
+    return next((attributes[key] for key in keys if key in attributes), None)
+
+def _title_keywords(game_title):
+    """Lowercased words of a game title, used as a cheap relevance gate for search results."""
+    return tuple(PUNCTUATION_RE.sub('', game_title.lower().translate(RELEASE_WORD_SEPARATORS)).split())
+
+def _is_relevant_title(title, title_keywords):
+    """True if the result title contains any of the game's keywords (or there are none to check)."""
+    if not title_keywords:
+        return True
+    title = (title or '').lower()
+    return any(keyword in title for keyword in title_keywords)
+
+def _read_torznab_item(elem, title_keywords):
+    """
+    Turns one <item> element into a result dict, or None if it is unusable.
+    The cheap rejections (title, link) run before the torznab:attr walk.
+    """
+    title = elem.findtext('title')
+    if not _is_relevant_title(title, title_keywords):
+        return None
+
+    link = elem.findtext('link') or ''
+    if not link.startswith('magnet:'):
+        link = None
+        for enclosure in elem.iterfind('enclosure'):
+            href = enclosure.get('url', '')
+            if href.startswith('magnet:') or enclosure.get('type') == 'application/x-bittorrent':
+                link = href
+                break
+    if not link:
+        return None
+
+    indexer = elem.find('jackettindexer')
+    return {
+        'title': title,
+        'link': link,
+        'size': elem.findtext('size'),
+        'grabs': elem.findtext('grabs'),
+        'type': elem.findtext('type') or 'unknown',
+        'indexer': (indexer.get('id') or indexer.text) if indexer is not None else 'Unknown',
+        'attributes': {a.get('name'): a.get('value') for a in elem.iterfind(f'{TORZNAB_NS}attr')},
+    }
+
+class _RecordingReader:
+    """File-like wrapper that keeps everything read through it, so a failed streaming parse can be redone on the same bytes."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._chunks = []
+
+    def read(self, size=-1):
+        chunk = self._stream.read(size)
+        self._chunks.append(chunk)
+        return chunk
+
+    def getvalue(self):
+        return b''.join(self._chunks)
+
+def _iter_torznab_items(stream, title_keywords=()):
+    """
+    Streams <item> elements out of a Torznab feed with ElementTree.iterparse and
+    yields the usable ones as plain dicts. Each element is cleared once read so
+    memory stays flat no matter how many results Jackett returns.
+    """
+    for _, elem in ET.iterparse(stream, events=('end',)):
+        if elem.tag != 'item':
+            continue
+        try:
+            item = _read_torznab_item(elem, title_keywords)
+        finally:
+            elem.clear()
+        if item:
+            yield item
+
+def _feedparser_torznab_items(feed, title_keywords=()):
+    """Fallback for feeds ElementTree cannot parse: maps feedparser entries to the same dicts."""
+    for item in feed.entries:
+        if not _is_relevant_title(item.get('title'), title_keywords):
+            continue
+        download_link = None
+        for link in item.get('links', ()):
+            href = link.get('href', '')
+            if href.startswith('magnet:') or link.get('type') == 'application/x-bittorrent':
+                download_link = href
+                break
+        if not download_link:
+            continue
+
+        torznab_attr = item.get('torznab_attr', [])
+        if isinstance(torznab_attr, dict):
+            torznab_attr = [torznab_attr]
+        pairs = ((a.get('@name', a.get('name')), a.get('@value', a.get('value'))) for a in torznab_attr if isinstance(a, dict))
+
+        indexer_raw = item.get('jackettindexer', 'Unknown')
+        yield {
+            'title': item.get('title'),
+            'link': download_link,
+            'size': item.get('size'),
+            'grabs': item.get('grabs'),
+            'type': item.get('type', 'unknown'),
+            'indexer': indexer_raw.get('id', indexer_raw) if isinstance(indexer_raw, dict) else indexer_raw,
+            'attributes': {name: value for name, value in pairs if name is not None and value is not None},
+        }
+
+def _search_jackett_uncached(game_title):
     """
     Searches Jackett and parses the Torznab feed.
     """
@@ -298,101 +641,157 @@ def search_jackett(game_title):
         f"?apikey={settings['jackett_api_key']}&t=search&cat=4000&q={urllib.parse.quote_plus(game_title)}"
     )
     
+    title_keywords = _title_keywords(game_title)
     try:
-        feed = feedparser.parse(url)
-        results = []
-        if not feed.entries:
-            return []
+        # Connection errors fall through to the handler below; the shared session has already retried them
+        with _fetch_feed(url) as response:
+            reader = _RecordingReader(response.raw)
+            try:
+                items = list(_iter_torznab_items(reader, title_keywords))
+            except ET.ParseError as e:
+                # feedparser tolerates malformed XML; reparse the bytes we already have instead of asking Jackett again
+                current_app.logger.warning(f"Jackett feed is not well-formed XML ({e}); reparsing it with feedparser.")
+                feed = feedparser.parse(reader.getvalue() + response.raw.read())
+                items = list(_feedparser_torznab_items(feed, title_keywords))
 
-        for item in feed.entries:
+        results = []
+        for item in items:
             try:
-                link_obj = next((link for link in item.links if 'magnet:' in link.href or link.type == 'application/x-bittorrent'), None)
-                if not link_obj:
-                    continue
-                
-                download_link = link_obj.href
-                size_in_bytes = item.get('size')
-                grabs = int(item.get('grabs', 0))
-                torznab_attr = item.get('torznab_attr', [])
-                attributes = {}
-                
-                if isinstance(torznab_attr, dict):
-                    if 'name' in torznab_attr and 'value' in torznab_attr:
-                        attributes[torznab_attr['name']] = torznab_attr['value']
-                elif isinstance(torznab_attr, list):
-                    for attr in torznab_attr:
-                        if isinstance(attr, dict):
-                            name_key = '@name' if '@name' in attr else 'name'
-                            value_key = '@value' if '@value' in attr else 'value'
-                            if name_key in attr and value_key in attr:
-                                attributes[attr[name_key]] = attr[value_key]
-
-                def safe_int(value, default=0):
-                    try: return int(value) if value is not None else default
-                    except (ValueError, TypeError): return default
-
-                seeders = 0
-                for seed_key in ['seeders', 'seeds', 'seeder']:
-                    if seed_key in attributes:
-                        seeders = safe_int(attributes[seed_key]); break
-
-                leechers, peers = 0, 0
-                for leech_key in ['leechers', 'leeches', 'leech']:
-                    if leech_key in attributes:
-                        leechers = safe_int(attributes[leech_key]); break
-                
+                attributes = item['attributes']
+
+                seeders = _safe_int(_first_attr(attributes, TORZNAB_SEEDER_KEYS))
+                leechers = _safe_int(_first_attr(attributes, TORZNAB_LEECHER_KEYS))
                 if leechers == 0:
-                    for peer_key in ['peers', 'peer']:
-                        if peer_key in attributes:
-                            peers = safe_int(attributes[peer_key])
-                            leechers = max(0, peers - seeders); break
+                    peers = _first_attr(attributes, TORZNAB_PEER_KEYS)
+                    if peers is not None:
+                        leechers = max(0, _safe_int(peers) - seeders)
 
-                tracker_type = item.get('type', 'unknown')
-                indexer_raw = item.get('jackettindexer', 'Unknown')
-                indexer = indexer_raw.get('id', indexer_raw) if isinstance(indexer_raw, dict) else indexer_raw
+                tracker_type = item['type']
+                grabs = int(item['grabs'] or 0)
 
-                results.append({
-                    'title': item.title, 'link': download_link, 'indexer': indexer,
+                # Sort key is built once here rather than by a lambda on every comparison
+                results.append(((grabs, seeders), {
+                    'title': item['title'], 'link': item['link'], 'indexer': item['indexer'],
                     'grabs': grabs,
                     'seeders': seeders if seeders > 0 or tracker_type != 'private' else -1,
                     'leechers': leechers if leechers > 0 or tracker_type != 'private' else -1,
-                    'size': _format_bytes(size_in_bytes)
-                })
-            except (AttributeError, ValueError, TypeError, StopIteration, KeyError) as e:
-                current_app.logger.error(f"Failed to parse a specific Jackett result for '{item.title}'. Error: {e}")
+                    # Raw byte count; the search page formats it with the format_bytes filter
+                    'size_bytes': int(float(item['size'])) if item['size'] is not None else None
+                }))
+            except (ValueError, TypeError, KeyError) as e:
+                current_app.logger.error(f"Failed to parse a specific Jackett result for '{item.get('title')}'. Error: {e}")
                 continue
         
-        return sorted(results, key=lambda x: (x['grabs'], x['seeders'] if x['seeders'] != -1 else 0), reverse=True)
+        results.sort(key=itemgetter(0), reverse=True)
+        return [result for _, result in results]
     
     except Exception as e:
         current_app.logger.error(f"A critical error occurred while fetching the Jackett feed: {e}")
         return []
 
+# --- torrent_hash -> Game.official_title cache for the activity page ---
+# Only hits are cached: hashes assigned by the background jobs must still be found on a later poll.
+HASH_TITLE_CACHE_MAX = 1000
+_hash_title_cache = {}
+_hash_title_lock = threading.Lock()
+
+def get_titles_for_hashes(hashes):
+    """Returns {torrent_hash: official_title} for the given hashes that belong to a game."""
+    with _hash_title_lock:
+        titles = {h: _hash_title_cache[h] for h in hashes if h in _hash_title_cache}
+    misses = [h for h in hashes if h not in titles]
+    if misses:
+        found = dict(db.session.query(Game.torrent_hash, Game.official_title).filter(Game.torrent_hash.in_(misses)).all())
+        titles.update(found)
+        with _hash_title_lock:
+            if len(_hash_title_cache) + len(found) > HASH_TITLE_CACHE_MAX:
+                _hash_title_cache.clear()
+            _hash_title_cache.update(found)
+    return titles
+
+def remember_torrent_title(torrent_hash, title):
+    """Records the title for a hash that was just assigned to a game."""
+    with _hash_title_lock:
+        _hash_title_cache[torrent_hash] = title
+
+def forget_torrent_title(torrent_hash):
+    """Drops a hash whose torrent or game has been removed."""
+    with _hash_title_lock:
+        _hash_title_cache.pop(torrent_hash, None)
+
+def _dialect_insert(model):
+    """INSERT construct for the configured database, so UPSERTs can use ON CONFLICT on SQLite and PostgreSQL."""
+    insert = postgresql_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+    return insert(model)
+
 def get_settings_dict():
-    """Helper function to get all settings as a dictionary."""
+    """
+    Helper function to get all settings as a dictionary.
+    Results are cached for SETTINGS_CACHE_TTL seconds; call invalidate_settings_cache() after writes.
+    """
+    global _settings_cache, _settings_cache_expires
+
+    with _settings_lock:
+        if _settings_cache is not None and time.time() < _settings_cache_expires:
+            return dict(_settings_cache)
+
     try:
-        settings = Setting.query.all()
-        return {setting.key: setting.value for setting in settings}
+        settings_dict = dict(db.session.query(Setting.key, Setting.value).all())
     except Exception as e:
         current_app.logger.error(f"Error fetching settings: {e}")
         return {}
 
+    with _settings_lock:
+        _settings_cache = settings_dict
+        _settings_cache_expires = time.time() + SETTINGS_CACHE_TTL
+    return dict(settings_dict)
+
+def invalidate_settings_cache():
+    """Drops the cached settings so the next get_settings_dict() call reads from the database."""
+    global _settings_cache
+    with _settings_lock:
+        _settings_cache = None
+
+# (connect, read) timeout for qBittorrent WebUI calls so a hung client can't pin a request thread
+QBIT_REQUEST_TIMEOUT = (3.05, 15)
+
+# One logged-in client per process. qbittorrent-api keeps the SID cookie on its session and
+# logs in again by itself when qBittorrent answers 403, so there is no need to re-auth per call.
+_qbit_client = None
+_qbit_client_signature = None
+_qbit_client_lock = threading.Lock()
+
 def get_qbit_client():
-    """Helper function to get an authenticated qBittorrent client."""
+    """
+    Helper function to get an authenticated qBittorrent client.
+    The client is reused until the connection settings change.
+    """
+    global _qbit_client, _qbit_client_signature
+
     settings = get_settings_dict()
-    if not all([settings.get(k) for k in ['qbittorrent_host', 'qbittorrent_port', 'qbittorrent_user', 'qbittorrent_pass']]):
+    signature = tuple(settings.get(k) for k in ['qbittorrent_host', 'qbittorrent_port', 'qbittorrent_user', 'qbittorrent_pass'])
+    if not all(signature):
         current_app.logger.error("qBittorrent credentials not configured.")
         return None
-    try:
-        client = Client(
-            host=settings.get('qbittorrent_host'), port=settings.get('qbittorrent_port'),
-            username=settings.get('qbittorrent_user'), password=settings.get('qbittorrent_pass')
-        )
-        client.auth_log_in()
+
+    with _qbit_client_lock:
+        if _qbit_client is not None and _qbit_client_signature == signature:
+            return _qbit_client
+        try:
+            client = Client(
+                host=settings.get('qbittorrent_host'), port=settings.get('qbittorrent_port'),
+                username=settings.get('qbittorrent_user'), password=settings.get('qbittorrent_pass'),
+                REQUESTS_ARGS={'timeout': QBIT_REQUEST_TIMEOUT}
+            )
+            client.auth_log_in()
+        except Exception as e:
+            current_app.logger.error(f"Error connecting to qBittorrent: {e}")
+            return None
+        _qbit_client, _qbit_client_signature = client, signature
         return client
-    except Exception as e:
-        current_app.logger.error(f"Error connecting to qBittorrent: {e}")
-        return None
+
+# How long add_to_qbittorrent waits for a newly added torrent to show up
+QBIT_ADD_POLL_TIMEOUT = 6.0
 
 def add_to_qbittorrent(magnet_link):
     """
@@ -405,21 +804,23 @@ def add_to_qbittorrent(magnet_link):
         if not client:
             raise Exception("Could not get qBittorrent client.")
 
-        # 1. Get the set of all torrent hashes that currently exist
-        existing_hashes = {t.hash for t in client.torrents_info()}
+        # 1. Get the set of torrent hashes that currently exist. The new torrent will carry
+        #    our tag and category, so only those need to be listed.
+        category = settings.get('qbittorrent_category') or None
+        existing_hashes = {t.hash for t in client.torrents_info(category=category, tag="gamearr")}
 
         # 2. Add the new torrent
-        category = settings.get('qbittorrent_category')
         result = client.torrents_add(urls=magnet_link, category=category, tags="gamearr")
 
         if result != "Ok.":
             current_app.logger.error(f"Failed to add torrent to qBittorrent: {result}")
             return None
 
-        # 3. Poll for a few seconds to find the new hash
-        time.sleep(1) # Initial delay
-        for _ in range(5): # Try for up to 5 seconds
-            new_hashes = {t.hash for t in client.torrents_info()}
+        # 3. Poll with exponential backoff; qBittorrent usually registers the torrent well under a second
+        deadline = time.monotonic() + QBIT_ADD_POLL_TIMEOUT
+        delay = 0.05
+        while True:
+            new_hashes = {t.hash for t in client.torrents_info(category=category, tag="gamearr")}
             added_hash_set = new_hashes - existing_hashes
             
             if added_hash_set:
@@ -427,7 +828,10 @@ def add_to_qbittorrent(magnet_link):
                 current_app.logger.info(f"    -> Successfully identified new torrent hash: {new_hash}")
                 return new_hash
             
-            time.sleep(1) # Wait and try again
+            if time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
 
         # 4. If the hash is still not found, something went wrong
         current_app.logger.error("Failed to identify new torrent hash after adding. The torrent may have failed to resolve.")
@@ -439,13 +843,14 @@ def add_to_qbittorrent(magnet_link):
 
 def check_source_rss(feed_url, game_title):
     try:
-        feed = feedparser.parse(feed_url)
+        with _fetch_feed(feed_url) as response:
+            feed = feedparser.parse(response.raw)
         if feed.entries:
             normalized_title = game_title.replace(':', '').lower()
             title_keywords = set(normalized_title.split())
             required_matches = max(2, int(len(title_keywords) * 0.75))
             for entry in feed.entries:
-                cleaned_entry_title_set = set(entry.title.replace('.', ' ').replace('_', ' ').lower().split())
+                cleaned_entry_title_set = set(entry.title.translate(SEARCH_TERM_SEPARATORS).lower().split())
                 matching_keywords = title_keywords.intersection(cleaned_entry_title_set)
                 if len(matching_keywords) >= required_matches:
                     current_app.logger.info(f"        --> Fuzzy match found! Matched {len(matching_keywords)}/{len(title_keywords)} keywords.")
@@ -454,6 +859,110 @@ def check_source_rss(feed_url, game_title):
         current_app.logger.info(f"    ERROR: RSS feed check for '{feed_url}' failed: {e}")
     return None
 
+# --- UNIFIED ENGINE CONSTANTS ---
+MOVIE_KEYWORDS = frozenset({'BDRIP', 'BLURAY', 'HDTV', 'X264', 'X265', 'DTSHD', 'DVDRIP'})
+PLATFORM_KEYWORDS = frozenset({'MACOS', 'LINUX', 'NSW', 'PS4', 'PS5', 'XBOX', 'WII', 'NGC', 'PS2DVD'})
+TYPE_BLOCKED_KEYWORDS = frozenset({'UPDATE', 'DLC', 'PATCH', 'CRACKFIX', 'TRAINER'})
+REPACK_GROUPS = frozenset({'FITGIRL', 'DODI', 'ELAMIGOS', 'KAOSKREW', 'MASQUERADE'})
+TIER_ORDER = {'Scene': 2, 'Repack': 1, 'P2P': 0}
+MATCH_SEPARATOR_RE = re.compile(r'[_.:-]')
+
+def _calculate_relevancy_score(game_release_date, release_timestamp):
+    if not game_release_date or not release_timestamp: return 0
+    try:
+        game_date = datetime.strptime(game_release_date, '%Y-%m-%d')
+        release_date = datetime.fromtimestamp(int(release_timestamp))
+        delta_days = (release_date - game_date).days
+        
+        if delta_days < -30: return -1000
+        if delta_days <= 90:    return 200
+        if delta_days <= 365:   return 150
+        if delta_days <= 730:   return 100
+        if delta_days <= 1095:  return 50
+        if delta_days <= 1460:  return 25
+        return -1000
+    except Exception:
+        return 0
+
+def _detect_type(release_name, original_type):
+    # Substring match on purpose: repack groups also appear glued to other words (e.g. 'FitGirl_Repack')
+    name_upper = release_name.upper()
+    if any(rg in name_upper for rg in REPACK_GROUPS):
+        return 'Repack'
+    return original_type
+
+# Groups whose alternative releases are always treated as repacks by the snatcher
+ALTERNATIVE_REPACK_GROUPS = frozenset({'FITGIRL', 'DODI', 'ELAMIGOS'})
+
+def _classify_alternative_release(alt):
+    """
+    Classifies an AlternativeRelease as 'Repack', 'Scene' or 'P2P' for the profile's release_types filter.
+    Used both when saving new alternatives and by the backfill, so every row follows the same rule.
+    """
+    if alt.source.upper() in ALTERNATIVE_REPACK_GROUPS:
+        return 'Repack'
+    # Scene names end in '-GROUP'; only the tail after the last hyphen matters.
+    _, sep, tail = alt.release_name.rpartition('-')
+    if sep and ' ' not in tail:
+        return 'Scene'
+    return 'P2P'
+
+def _simplify_text(text):
+    """Lowercases, strips separators/punctuation and folds accents (e.g. 'ö' -> 'o')."""
+    # Convert to lowercase
+    text = text.lower()
+    # Replace common separators with spaces
+    text = MATCH_SEPARATOR_RE.sub(' ', text)
+    # Normalize Unicode characters to their base ASCII form (e.g., ö -> o)
+    text = ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
+    # Remove any remaining non-alphanumeric characters (except spaces)
+    text = PUNCTUATION_RE.sub('', text)
+    # Collapse multiple spaces
+    return ' '.join(text.split())
+
+# --- Release sources are independent network calls; query them side by side ---
+_source_executor = ForkSafeExecutor(max_workers=8, thread_name_prefix='release-source')
+
+# Re-scans, queue retries and library scans often re-check a title within minutes. Keep this
+# TTL below the 30-minute release check interval so scheduled checks always see fresh results.
+RELEASE_SOURCES_TTL = 15 * 60
+_release_sources_cache = _TTLCache(ttl=RELEASE_SOURCES_TTL, maxsize=512)
+# What each source returns when it finds nothing, in _gather_release_sources order
+RELEASE_SOURCE_EMPTY_RESULTS = ([], [], [], None)
+
+def _gather_release_sources(title):
+    """
+    Runs predb.club, predb.net, xrel.to and FitGirl concurrently, so a scan takes
+    as long as the slowest source instead of the sum of all four. Each source
+    already swallows its own errors and returns an empty result.
+    """
+    app = current_app._get_current_object()
+
+    def _call(source):
+        with app.app_context():
+            return source(title)
+
+    cached = _release_sources_cache.get(title)
+    if cached is not None:
+        current_app.logger.info(f"    -> Using release source results for '{title}' from the last {RELEASE_SOURCES_TTL // 60} minutes.")
+        return cached
+
+    sources = (_search_predb_club, _search_predb_net, check_source_xrel, check_source_fitgirl)
+    futures = [_source_executor.submit(_call, source) for source in sources]
+    results = []
+    timed_out = False
+    for source, future, empty in zip(sources, futures, RELEASE_SOURCE_EMPTY_RESULTS):
+        try:
+            results.append(future.result(timeout=POOLED_RESULT_TIMEOUT))
+        except FutureTimeoutError:
+            current_app.logger.error(f"    -> ERROR: {source.__name__} did not answer within {POOLED_RESULT_TIMEOUT}s for '{title}'.")
+            results.append(empty)
+            timed_out = True
+    # Don't cache an incomplete scan; the next check should ask the slow source again
+    if not timed_out:
+        _release_sources_cache.set(title, results)
+    return results
+
 def process_all_releases_for_game(game_id):
     """
     The single, unified engine to find, categorize, and process ALL releases 
@@ -466,69 +975,18 @@ def process_all_releases_for_game(game_id):
 
     current_app.logger.info(f"--> Starting UNIFIED release scan for '{game.official_title}' (Current Status: {game.status})")
 
-    # --- ENGINE CONSTANTS ---
-    MOVIE_KEYWORDS = {'BDRIP', 'BLURAY', 'HDTV', 'X264', 'X265', 'DTSHD', 'DVDRIP'}
-    PLATFORM_KEYWORDS = {'MACOS', 'LINUX', 'NSW', 'PS4', 'PS5', 'XBOX', 'WII', 'NGC', 'PS2DVD'}
-    TYPE_BLOCKED_KEYWORDS = {'UPDATE', 'DLC', 'PATCH', 'CRACKFIX', 'TRAINER'}
-    REPACK_GROUPS = {'FITGIRL', 'DODI', 'ELAMIGOS', 'KAOSKREW', 'MASQUERADE'}
-    TIER_ORDER = {'Scene': 2, 'Repack': 1, 'P2P': 0}
-
-    # --- HELPER FUNCTIONS ---
-    def _calculate_relevancy_score(game_release_date, release_timestamp):
-        if not game_release_date or not release_timestamp: return 0
-        try:
-            game_date = datetime.strptime(game_release_date, '%Y-%m-%d')
-            release_date = datetime.fromtimestamp(int(release_timestamp))
-            delta_days = (release_date - game_date).days
-            
-            if delta_days < -30: return -1000
-            if delta_days <= 90:    return 200
-            if delta_days <= 365:   return 150
-            if delta_days <= 730:   return 100
-            if delta_days <= 1095:  return 50
-            if delta_days <= 1460:  return 25
-            return -1000
-        except Exception:
-            return 0
-    
-    def _detect_type(release_name, original_type):
-        if any(rg in release_name.upper() for rg in REPACK_GROUPS):
-            return 'Repack'
-        return original_type
-
-    # --- NEW, MORE ROBUST MATCHING FUNCTION ---
-    def _is_valid_game_match(official_title, candidate_name):
-        """
-        Compares two strings by simplifying them to a common ASCII format.
-        This correctly handles special characters like 'ö' vs 'o'.
-        """
-        def _simplify_text(text):
-            # Convert to lowercase
-            text = text.lower()
-            # Replace common separators with spaces
-            text = re.sub(r'[_.:-]', ' ', text)
-            # Normalize Unicode characters to their base ASCII form (e.g., ö -> o)
-            text = ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
-            # Remove any remaining non-alphanumeric characters (except spaces)
-            text = re.sub(r'[^\w\s]', '', text)
-            # Collapse multiple spaces
-            return re.sub(r'\s+', ' ', text).strip()
-
-        simplified_title = _simplify_text(official_title)
-        simplified_candidate = _simplify_text(candidate_name)
-
-        return simplified_title in simplified_candidate
-
     # --- STEP 1: GATHER EVERYTHING FROM ALL SOURCES ---
+    predb_club_results, predb_net_results, xrel_results, fitgirl_release = _gather_release_sources(game.official_title)
+
+    # Merge in priority order: predb.club wins over predb.net, which wins over xrel.to
     all_releases = {}
-    for r in _search_predb_club(game.official_title):
+    for r in predb_club_results:
         if r['release']: all_releases[r['release']] = {'source': r['group'] or 'Scene', 'type': 'Scene', 'timestamp': r['timestamp']}
-    for r in _search_predb_net(game.official_title):
+    for r in predb_net_results:
         if r['release']: all_releases.setdefault(r['release'], {'source': r['group'] or 'Scene', 'type': 'Scene', 'timestamp': r['timestamp']})
-    for r in check_source_xrel(game.official_title):
+    for r in xrel_results:
         if r['release']: all_releases.setdefault(r['release'], {'source': r['group'] or 'P2P', 'type': 'P2P', 'timestamp': r['timestamp']})
     
-    fitgirl_release = check_source_fitgirl(game.official_title)
     if fitgirl_release:
         all_releases.setdefault(fitgirl_release, {'source': 'FitGirl', 'type': 'Repack', 'timestamp': int(time.time())})
     
@@ -542,10 +1000,11 @@ def process_all_releases_for_game(game_id):
     current_app.logger.info(f"    -> Found {len(all_releases)} total releases. Categorizing and filtering...")
     base_game_candidates = []
     add_ons = []
+    simplified_title = _simplify_text(game.official_title)
 
     for name, data in all_releases.items():
         clean_name = html.unescape(name)
-        upper_words = set(clean_name.upper().replace('.', ' ').replace('_', ' ').replace('-', ' ').split())
+        upper_words = frozenset(clean_name.upper().translate(RELEASE_WORD_SEPARATORS).split())
         
         if not TYPE_BLOCKED_KEYWORDS.isdisjoint(upper_words):
             add_ons.append({'release_name': clean_name, **data})
@@ -554,8 +1013,8 @@ def process_all_releases_for_game(game_id):
         if not MOVIE_KEYWORDS.isdisjoint(upper_words):
             continue
         
-        # --- USE THE NEW, ROBUST MATCHER ---
-        if not _is_valid_game_match(game.official_title, clean_name):
+        # --- USE THE NEW, ROBUST MATCHER (accent-insensitive substring match) ---
+        if simplified_title not in _simplify_text(clean_name):
             continue
             
         data['score'] = _calculate_relevancy_score(game.release_date, data.get('timestamp'))
@@ -588,9 +1047,9 @@ def process_all_releases_for_game(game_id):
                         release_name=alt_data['release_name'], source=alt_data['source'], game_id=game.id,
                         nfo_path=nfo_path, nfo_img_path=nfo_img_path
                     )
+                    alt_release.release_type = _classify_alternative_release(alt_release)
                     db.session.add(alt_release)
                     new_alt_count += 1
-                    time.sleep(1)
             if new_alt_count > 0:
                  current_app.logger.info(f"    -> Saved {new_alt_count} new alternative releases.")
         else:
@@ -616,8 +1075,8 @@ def process_all_releases_for_game(game_id):
                     release_name=alt_data['release_name'], source=alt_data['source'], game_id=game.id,
                     nfo_path=nfo_path, nfo_img_path=nfo_img_path
                 )
+                alt_release.release_type = _classify_alternative_release(alt_release)
                 db.session.add(alt_release)
-                time.sleep(1) # <--- AND ADD POLITE DELAY HERE
             current_app.logger.info(f"    -> Saved {len(alternative_releases)} alternative releases.")
 
     # --- STEP 4: PROCESS ADD-ONS ---
@@ -641,27 +1100,43 @@ def process_all_releases_for_game(game_id):
     db.session.commit()
     current_app.logger.info(f"--> Finished UNIFIED release scan for '{game.official_title}'")
 
+# NFO text and NFO image are independent downloads; fetch them side by side
+_nfo_executor = ForkSafeExecutor(max_workers=4, thread_name_prefix='nfo-download')
+
+def _download_nfo_text(url, dest_path):
+    """
+    Downloads an NFO file to dest_path as raw bytes; NFOs are CP437 art and are served
+    back verbatim, so there is nothing to gain from decoding them. Returns the path,
+    or None on a non-200 response.
+    """
+    response = _http_get(url, timeout=15)
+    if response.status_code != 200:
+        return None
+    with open(dest_path, 'wb') as f:
+        f.write(response.content)
+    return dest_path
+
+def _download_nfo_image(url, dest_path):
+    """Streams an NFO image to dest_path. Returns the path, or None on a non-200 response."""
+    with _http_get(url, timeout=15, stream=True) as response:
+        if response.status_code != 200:
+            return None
+        response.raw.decode_content = True
+        with open(dest_path, 'wb') as f:
+            shutil.copyfileobj(response.raw, f)
+    return dest_path
+
 def fetch_and_save_nfo(release_name):
     """
-    Fetches NFO data and image, now with retry logic for network resilience.
+    Fetches NFO data and image. Retries come from the shared HTTP session.
     """
     current_app.logger.info(f"NFO Fetcher: Attempting to fetch NFO for '{release_name}'")
 
-    # Setup a requests session with a retry strategy
-    retry_strategy = Retry(
-        total=3,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
-    )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    http = requests.Session()
-    http.mount("https://", adapter)
-
     try:
         url = "https://api.predb.net/"
         params = {'type': 'nfo', 'release': release_name}
         
-        response = http.get(url, params=params, timeout=15)
+        response = _http_get(url, params=params, timeout=15)
         response.raise_for_status()
         json_data = response.json()
         nfo_data_dict = json_data.get('data')
@@ -673,29 +1148,22 @@ def fetch_and_save_nfo(release_name):
         nfo_url = nfo_data_dict.get('nfo')
         nfo_img_url = nfo_data_dict.get('nfo_img')
         nfo_storage_path = os.path.join(current_app.root_path, 'nfo_storage')
-        os.makedirs(nfo_storage_path, exist_ok=True)
         
+        safe_filename = UNSAFE_FILENAME_RE.sub('', release_name).rstrip()
+        nfo_future = _nfo_executor.submit(_download_nfo_text, nfo_url, os.path.join(nfo_storage_path, f"{safe_filename}.nfo")) if nfo_url else None
+        img_future = _nfo_executor.submit(_download_nfo_image, nfo_img_url, os.path.join(nfo_storage_path, f"{safe_filename}.png")) if nfo_img_url else None
+
         local_nfo_path, local_nfo_img_path = None, None
 
-        if nfo_url:
+        if nfo_future:
             try:
-                nfo_response = http.get(nfo_url, timeout=15)
-                if nfo_response.status_code == 200:
-                    safe_filename = "".join(c for c in release_name if c.isalnum() or c in ('_', '-')).rstrip()
-                    local_nfo_path = os.path.join(nfo_storage_path, f"{safe_filename}.nfo")
-                    with open(local_nfo_path, 'w', encoding='utf-8', errors='ignore') as f:
-                        f.write(nfo_response.text)
+                local_nfo_path = nfo_future.result(timeout=POOLED_RESULT_TIMEOUT)
             except Exception as e:
                 current_app.logger.warning(f"NFO Fetcher: Could not download NFO file for '{release_name}': {e}")
 
-        if nfo_img_url:
+        if img_future:
             try:
-                nfo_img_response = http.get(nfo_img_url, timeout=15)
-                if nfo_img_response.status_code == 200:
-                    safe_filename = "".join(c for c in release_name if c.isalnum() or c in ('_', '-')).rstrip()
-                    local_nfo_img_path = os.path.join(nfo_storage_path, f"{safe_filename}.png")
-                    with open(local_nfo_img_path, 'wb') as f:
-                        f.write(nfo_img_response.content)
+                local_nfo_img_path = img_future.result(timeout=POOLED_RESULT_TIMEOUT)
             except Exception as e:
                 current_app.logger.warning(f"NFO Fetcher: Could not download NFO image for '{release_name}': {e}")
         
@@ -707,22 +1175,24 @@ def fetch_and_save_nfo(release_name):
         current_app.logger.warning(f"NFO Fetcher: A non-retryable error occurred for '{release_name}': {e}")
         return None, None
 
+ADDON_PLATFORM_EXCLUSIONS = frozenset({'NSW', 'LINUX', 'MACOS', 'PS5', 'PS4', 'XBOX'})
+ADDON_TYPE_MAP = {'CRACKFIX': 'Fix', 'DLC': 'DLC', 'UPDATE': 'Update', 'PATCH': 'Update', 'FIX': 'Fix', 'TRAINER': 'Trainer'}
+
 def parse_additional_release_info(release_name):
     """
     Takes a raw release name and identifies if it is a VALID additional release.
     """
-    name_upper = release_name.upper().replace('.', ' ').replace('_', ' ').replace('-', ' ')
-    PLATFORM_EXCLUSIONS = {'NSW', 'LINUX', 'MACOS', 'PS5', 'PS4', 'XBOX'}
-    release_keyword_set = set(name_upper.split())
-    if any(platform in release_keyword_set for platform in PLATFORM_EXCLUSIONS):
+    name_upper = release_name.upper().translate(RELEASE_WORD_SEPARATORS)
+    if not ADDON_PLATFORM_EXCLUSIONS.isdisjoint(name_upper.split()):
         return None
 
-    type_map = {'CRACKFIX': 'Fix', 'DLC': 'DLC', 'UPDATE': 'Update', 'PATCH': 'Update', 'FIX': 'Fix', 'TRAINER': 'Trainer'}
-    for keyword, type_name in type_map.items():
+    for keyword, type_name in ADDON_TYPE_MAP.items():
         if f' {keyword} ' in name_upper or name_upper.endswith(f' {keyword}'):
             return type_name
     return None
 
+LIBRARY_IGNORE_FOLDERS = frozenset({'_downloads', '@eaDir'})
+
 def scan_library_folder():
     """
     Scans the library path for folders that aren't already in the database.
@@ -733,15 +1203,33 @@ def scan_library_folder():
         current_app.logger.error(f"Library path not found or is not a directory.")
         return []
 
-    IGNORE_FOLDERS = {'_downloads', '@eaDir'}
-    existing_folders = {game.local_path for game in Game.query.all() if game.local_path}
+    skip_names = LIBRARY_IGNORE_FOLDERS.union(
+        path for (path,) in db.session.query(Game.local_path).filter(Game.local_path.isnot(None))
+    )
     found_folders = []
     with os.scandir(library_path) as it:
         for entry in it:
-            if entry.is_dir() and entry.name not in existing_folders and entry.name not in IGNORE_FOLDERS:
+            # Name lookups first; is_dir() uses the cached d_type and only stats symlinks,
+            # which are followed on purpose so symlinked game folders are still found
+            if entry.name not in skip_names and entry.is_dir():
                 found_folders.append(entry.name)
     return found_folders
 
+@lru_cache(maxsize=4096)
+def _library_keywords(title):
+    """
+    Keyword set used to spot folders that are already in the library. Memoized per
+    title because _clean_release_name runs PTN, and every scan re-checks every game.
+    """
+    return frozenset(_clean_release_name(title).split())
+
+def _keyword_signature(keywords):
+    """64-bit bitmap of a keyword set. If a's bits aren't all in b's, a can't be a subset of b."""
+    signature = 0
+    for keyword in keywords:
+        signature |= 1 << (hash(keyword) & 63)
+    return signature
+
 def process_library_scan():
     """
     The main service function for the library import feature.
@@ -750,32 +1238,53 @@ def process_library_scan():
     if not untracked_folders:
         return []
 
-    all_games_in_db = Game.query.all()
-    existing_title_keyword_sets = [set(_clean_release_name(game.official_title).split()) for game in all_games_in_db]
-    results = []
+    titles = db.session.query(Game.official_title).filter(Game.official_title.isnot(None)).all()
+    # Games with the same cleaned title collapse into one set
+    existing_title_keyword_sets = list({_library_keywords(title) for (title,) in titles})
+    existing_signatures = [_keyword_signature(keywords) for keywords in existing_title_keyword_sets]
+
+    # Inverted index: keyword -> ids of the keyword sets containing it, so each folder
+    # is only compared against games that share its rarest keyword
+    postings = defaultdict(list)
+    for set_id, keywords in enumerate(existing_title_keyword_sets):
+        for keyword in keywords:
+            postings[keyword].append(set_id)
+
+    new_folders = []
     current_app.logger.info("--- Matching folders to IGDB (and checking for duplicates) ---")
 
     for folder in untracked_folders:
         guessed_title = _clean_release_name(folder)
-        guessed_keywords = set(_clean_release_name(guessed_title).split())
+        guessed_keywords = _library_keywords(guessed_title)
 
         is_already_in_library = False
-        for existing_keywords in existing_title_keyword_sets:
-            if guessed_keywords.issubset(existing_keywords):
-                is_already_in_library = True; break
+        if not guessed_keywords:
+            # An empty guess is a subset of anything
+            is_already_in_library = bool(existing_title_keyword_sets)
+        elif all(keyword in postings for keyword in guessed_keywords):
+            rarest = min(guessed_keywords, key=lambda keyword: len(postings[keyword]))
+            guessed_signature = _keyword_signature(guessed_keywords)
+            for set_id in postings[rarest]:
+                # One AND rejects most candidates before the real subset test
+                if (guessed_signature & existing_signatures[set_id]) == guessed_signature and guessed_keywords <= existing_title_keyword_sets[set_id]:
+                    is_already_in_library = True; break
 
         if is_already_in_library:
             current_app.logger.info(f"Folder: '{folder}'  --> Guessed Title: '{guessed_title}' [SKIPPING - Already in library]")
             continue
 
         current_app.logger.info(f"Folder: '{folder}'  --> Guessed Title: '{guessed_title}' [NEW - Searching IGDB]")
-        igdb_matches = search_igdb(guessed_title)
-        results.append({
+        new_folders.append((folder, guessed_title))
+
+    # One multiquery POST per ten folders instead of one search per folder
+    igdb_matches = search_igdb_batch([guessed_title for _, guessed_title in new_folders])
+    return [
+        {
             'folder_name': folder,
             'guessed_title': guessed_title,
-            'igdb_matches': igdb_matches
-        })
-    return results
+            'igdb_matches': igdb_matches[guessed_title]
+        } for folder, guessed_title in new_folders
+    ]
 
 def process_and_import_game(game_id):
     """
@@ -831,7 +1340,7 @@ def process_and_import_game(game_id):
         
         # --- NEW & IMPROVED FOLDER STRUCTURE ---
         library_path = Path(current_app.config['LIBRARY_PATH'])
-        clean_title = "".join(c for c in game.official_title if c.isalnum() or c in (' ', '.', '-')).rstrip()
+        clean_title = _safe_folder_name(game.official_title)
         dest_root_path = library_path / clean_title # e.g., /games/The Precinct/
         dest_game_path = dest_root_path / (game.release_name or torrent_info.name) # e.g., /games/The Precinct/The.Precinct-RUNE/
 
@@ -1033,10 +1542,19 @@ def process_and_import_addon(addon_id):
             qbit_client.torrents_resume(torrent_hashes=addon.torrent_hash)
         raise e
 
+RELEASE_JUNK_PATTERNS = tuple(
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (r'v\d+(\.\d+)*', r'\d{3,4}p', r'repack', r'multi\d*', r'dlc')
+)
+RELEASE_JUNK_CHARS = str.maketrans('', '', ":'!,[]")
+
+@lru_cache(maxsize=4096)
 def _clean_release_name(release_name):
     """
     A more robust function for cleaning release strings for IGDB searching.
     It intelligently removes the release group before cleaning other keywords.
+    Memoized: PTN.parse costs close to a millisecond, and every library scan
+    re-cleans the same untracked folder names.
     """
     if not isinstance(release_name, str): return ""
 
@@ -1053,150 +1571,168 @@ def _clean_release_name(release_name):
             cleaned = parts[0]  # We only want the part before the group
 
     # --- Now, perform the standard cleaning on the result ---
-    cleaned = cleaned.lower().replace('.', ' ').replace('_', ' ').replace('-', ' ')
+    cleaned = cleaned.lower().translate(RELEASE_WORD_SEPARATORS)
     
     # Use PTN to handle things like year, resolution, etc., that might still be left
     info = PTN.parse(cleaned)
     cleaned = info.get('title', cleaned)
 
     # This list is now a fallback for other junk keywords PTN might miss
-    patterns_to_remove = [
-        r'v\d+(\.\d+)*', r'\d{3,4}p', r'repack', r'multi\d*', r'dlc'
-    ]
-    for pattern in patterns_to_remove:
-        cleaned = re.sub(pattern, '', cleaned, flags=re.IGNORECASE)
+    for pattern in RELEASE_JUNK_PATTERNS:
+        cleaned = pattern.sub('', cleaned)
 
-    cleaned = re.sub(r"[:'!,\[\]]", "", cleaned)
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    return cleaned
+    return ' '.join(cleaned.translate(RELEASE_JUNK_CHARS).split())
 
 def _get_igdb_headers():
     """
     A private helper that gets and CACHES the required auth headers for any IGDB API call.
+    Twitch app tokens live for weeks, so we only re-authenticate when the cached token is
+    within a minute of expiring (or after _invalidate_igdb_token() on a 401).
     """
     global _igdb_access_token, _igdb_token_expires
 
-    if not _igdb_access_token or time.time() > (_igdb_token_expires - 60):
-        current_app.logger.info("IGDB token is missing or expired. Requesting a new one...")
-        settings = get_settings_dict()
-        twitch_client_id = settings.get('twitch_client_id')
-        twitch_client_secret = settings.get('twitch_client_secret')
-        
-        if not all([twitch_client_id, twitch_client_secret]):
-            raise Exception("Twitch API credentials are not configured.")
+    settings = get_settings_dict()
+    with _igdb_token_lock:
+        if not _igdb_access_token or time.monotonic() > (_igdb_token_expires - 60):
+            current_app.logger.info("IGDB token is missing or expired. Requesting a new one...")
+            twitch_client_id = settings.get('twitch_client_id')
+            twitch_client_secret = settings.get('twitch_client_secret')
+            
+            if not all([twitch_client_id, twitch_client_secret]):
+                raise Exception("Twitch API credentials are not configured.")
 
-        auth_url = 'https://id.twitch.tv/oauth2/token'
-        auth_params = {'client_id': twitch_client_id, 'client_secret': twitch_client_secret, 'grant_type': 'client_credentials'}
-        auth_response = requests.post(auth_url, params=auth_params, timeout=10)
-        auth_response.raise_for_status()
-        
-        token_data = auth_response.json()
-        _igdb_access_token = token_data['access_token']
-        _igdb_token_expires = time.time() + token_data['expires_in']
-        current_app.logger.info("Successfully obtained new IGDB token.")
+            auth_url = 'https://id.twitch.tv/oauth2/token'
+            auth_params = {'client_id': twitch_client_id, 'client_secret': twitch_client_secret, 'grant_type': 'client_credentials'}
+            auth_response = _http_post(auth_url, params=auth_params, timeout=10)
+            auth_response.raise_for_status()
+            
+            token_data = auth_response.json()
+            _igdb_access_token = token_data['access_token']
+            _igdb_token_expires = time.monotonic() + token_data['expires_in']
+            current_app.logger.info("Successfully obtained new IGDB token.")
+        token = _igdb_access_token
 
     return {
-        'Client-ID': get_settings_dict().get('twitch_client_id'),
-        'Authorization': f'Bearer {_igdb_access_token}',
+        'Client-ID': settings.get('twitch_client_id'),
+        'Authorization': f'Bearer {token}',
         'User-Agent': 'Gamearr/1.0 (Python/Requests)'
     }
 
+def _invalidate_igdb_token():
+    """Drops the cached IGDB token so the next _get_igdb_headers() call re-authenticates."""
+    global _igdb_access_token, _igdb_token_expires
+    with _igdb_token_lock:
+        _igdb_access_token = None
+        _igdb_token_expires = 0
+
+def _igdb_post(url, data, timeout=10):
+    """
+    POSTs an Apicalypse query to IGDB using the cached token. If Twitch has revoked
+    the token early (HTTP 401), re-authenticates once and retries.
+    """
+    response = _http_post(url, headers=_get_igdb_headers(), data=data, timeout=timeout)
+    if response.status_code == 401:
+        current_app.logger.warning("IGDB rejected the cached token (401). Re-authenticating once...")
+        _invalidate_igdb_token()
+        response = _http_post(url, headers=_get_igdb_headers(), data=data, timeout=timeout)
+    return response
+
+DISCOVER_CANDIDATE_LIMIT = 200
+DISCOVER_LIST_SIZE = 12
+
+def _igdb_multiquery(queries, timeout=20):
+    """
+    Sends several IGDB queries in one /v4/multiquery POST.
+    `queries` maps a result name to (endpoint, query body); returns {name: results}.
+    """
+    body = ''.join(f'query {endpoint} "{name}" {{ {query} }};' for name, (endpoint, query) in queries.items())
+    response = _igdb_post(IGDB_MULTIQUERY_URL, body, timeout=timeout)
+    response.raise_for_status()
+    return {block.get('name'): block.get('result', []) for block in orjson.loads(response.content)}
+
+def _discover_list_queries(now_timestamp):
+    """
+    First round of the discover update: the two popularity rankings plus the two
+    lists that need no second lookup.
+    """
+    ninety_days_from_now = now_timestamp + (90 * 24 * 60 * 60)
+    one_year_ago = now_timestamp - (365 * 24 * 60 * 60)
+    return {
+        # 'Most Anticipated' and 'Popular Right Now' start from popularity rankings
+        'anticipated': ('popularity_primitives', f'fields game_id, value; where popularity_type = 2; sort value desc; limit {DISCOVER_CANDIDATE_LIMIT};'),
+        'popular_now': ('popularity_primitives', f'fields game_id, value; where popularity_type = 3; sort value desc; limit {DISCOVER_CANDIDATE_LIMIT};'),
+        # 'Coming Soon': PC games releasing in the next 90 days
+        'coming_soon': ('games', f'fields name, cover.url, first_release_date, slug; where first_release_date > {now_timestamp} & first_release_date < {ninety_days_from_now} & platforms = (6); sort first_release_date asc; limit {DISCOVER_LIST_SIZE};'),
+        # 'Top Reviewed': best rated PC games released in the last year
+        'top_reviewed': ('games', (
+            f'fields name, cover.url, first_release_date, slug, total_rating, total_rating_count; ' # Use total_rating
+            f'where first_release_date < {now_timestamp} & first_release_date > {one_year_ago} '    # Look back one year
+            f'& platforms = (6) & total_rating > 75 & total_rating_count > 5; '                   # Add rating count filter
+            f'sort total_rating desc; limit {DISCOVER_LIST_SIZE};'                                 # Sort by total_rating
+        )),
+    }
+
+def _discover_details_queries(ranked_ids, now_timestamp):
+    """Second round: game details for the ranked candidates, filtered to PC releases."""
+    queries = {}
+    if ranked_ids['anticipated']:
+        ids_string = ",".join(map(str, ranked_ids['anticipated']))
+        # --- THE FINAL FIX: Include games where platforms are unannounced ---
+        queries['anticipated'] = ('games', (
+            f'fields name, cover.url, first_release_date, slug; '
+            f'where id = ({ids_string}) & first_release_date > {now_timestamp} & (platforms = (6) | platforms = null); limit {DISCOVER_CANDIDATE_LIMIT};'
+        ))
+    if ranked_ids['popular_now']:
+        ids_string = ",".join(map(str, ranked_ids['popular_now']))
+        queries['popular_now'] = ('games', (
+            f'fields name, cover.url, slug, aggregated_rating; '
+            f'where id = ({ids_string}) & first_release_date < {now_timestamp} & platforms = (6); limit {DISCOVER_CANDIDATE_LIMIT};'
+        ))
+    return queries
+
 def update_discover_lists():
     """
     Fetches and caches high-quality IGDB discover lists using a smarter filter for anticipated games.
+    Everything goes through two multiquery POSTs: the rankings and the two plain lists first,
+    then the details for the ranked candidates.
     """
     current_app.logger.info("--- Starting Discover list update (using API v4) ---")
     try:
-        headers = _get_igdb_headers()
+        _get_igdb_headers()  # Fail fast if Twitch credentials are missing
         now_timestamp = int(time.time())
 
-        popularity_api_url = "https://api.igdb.com/v4/popularity_primitives"
-        games_api_url = "https://api.igdb.com/v4/games"
-        
-        CANDIDATE_LIMIT = 200 
+        first_round = _igdb_multiquery(_discover_list_queries(now_timestamp))
+        lists_to_cache = {'coming_soon': first_round.get('coming_soon', []), 'top_reviewed': first_round.get('top_reviewed', [])}
 
-        # --- "MOST ANTICIPATED" LOGIC (Final Version) ---
-        anticipated_games = []
-        try:
-            current_app.logger.info("    -> Fetching 'Most Anticipated' list...")
-            pop_query = f'fields game_id, value; where popularity_type = 2; sort value desc; limit {CANDIDATE_LIMIT};'
-            pop_response = requests.post(popularity_api_url, headers=headers, data=pop_query, timeout=20)
-            pop_response.raise_for_status()
-            
-            ids = [item['game_id'] for item in pop_response.json() if 'game_id' in item]
-            current_app.logger.info(f"       - Found {len(ids)} potential anticipated game IDs.")
-
-            if ids:
-                ids_string = ",".join(map(str, ids))
-                # --- THE FINAL FIX: Include games where platforms are unannounced ---
-                details_query = (
-                    f'fields name, cover.url, first_release_date, slug; '
-                    f'where id = ({ids_string}) & first_release_date > {now_timestamp} & (platforms = (6) | platforms = null); limit {CANDIDATE_LIMIT};'
-                )
-                details_response = requests.post(games_api_url, headers=headers, data=details_query, timeout=20)
-                details_response.raise_for_status()
-                
-                game_map = {game['id']: game for game in details_response.json()}
-                anticipated_games = [game_map[gid] for gid in ids if gid in game_map][:12]
-                current_app.logger.info(f"       - Built list with {len(anticipated_games)} final games.")
-        except Exception as e:
-            current_app.logger.error(f"    -> Failed to build 'Most Anticipated' list: {e}")
-
-        # --- "POPULAR RIGHT NOW" LOGIC (No changes needed here) ---
-        popular_now_games = []
-        try:
-            current_app.logger.info("    -> Fetching 'Popular Right Now' list...")
-            pop_query = f'fields game_id, value; where popularity_type = 3; sort value desc; limit {CANDIDATE_LIMIT};'
-            pop_response = requests.post(popularity_api_url, headers=headers, data=pop_query, timeout=20)
-            pop_response.raise_for_status()
-            
-            ids = [item['game_id'] for item in pop_response.json() if 'game_id' in item]
-            current_app.logger.info(f"       - Found {len(ids)} potential popular game IDs.")
-            
-            if ids:
-                ids_string = ",".join(map(str, ids))
-                details_query = (
-                    f'fields name, cover.url, slug, aggregated_rating; '
-                    f'where id = ({ids_string}) & first_release_date < {now_timestamp} & platforms = (6); limit {CANDIDATE_LIMIT};'
-                )
-                details_response = requests.post(games_api_url, headers=headers, data=details_query, timeout=20)
-                details_response.raise_for_status()
-                
-                game_map = {game['id']: game for game in details_response.json()}
-                popular_now_games = [game_map[gid] for gid in ids if gid in game_map][:12]
-                current_app.logger.info(f"       - Built list with {len(popular_now_games)} final games.")
-        except Exception as e:
-            current_app.logger.error(f"    -> Failed to build 'Popular Right Now' list: {e}")
-
-        # --- (The rest of the queries remain the same) ---
-        ninety_days_from_now = now_timestamp + (90 * 24 * 60 * 60)
-        coming_soon_query = f'fields name, cover.url, first_release_date, slug; where first_release_date > {now_timestamp} & first_release_date < {ninety_days_from_now} & platforms = (6); sort first_release_date asc; limit 12;'
-        response_coming_soon = requests.post(games_api_url, headers=headers, data=coming_soon_query, timeout=20)
-        coming_soon_games = response_coming_soon.json()
-
-        one_year_ago = now_timestamp - (365 * 24 * 60 * 60)
-        top_reviewed_query = (
-            f'fields name, cover.url, first_release_date, slug, total_rating, total_rating_count; ' # Use total_rating
-            f'where first_release_date < {now_timestamp} & first_release_date > {one_year_ago} '    # Look back one year
-            f'& platforms = (6) & total_rating > 75 & total_rating_count > 5; '                   # Add rating count filter
-            f'sort total_rating desc; limit 12;'                                                     # Sort by total_rating
-        )
-        response_top_reviewed = requests.post(games_api_url, headers=headers, data=top_reviewed_query, timeout=20)
-        top_reviewed_games = response_top_reviewed.json()
-        
-        # Cache all four lists in the database
-        lists_to_cache = {
-            'anticipated': anticipated_games,
-            'popular_now': popular_now_games,
-            'coming_soon': coming_soon_games,
-            'top_reviewed': top_reviewed_games
+        ranked_ids = {
+            name: [item['game_id'] for item in first_round.get(name, []) if 'game_id' in item]
+            for name in ('anticipated', 'popular_now')
         }
+        current_app.logger.info(f"    -> Found {len(ranked_ids['anticipated'])} anticipated and {len(ranked_ids['popular_now'])} popular candidate IDs.")
 
-        for name, content in lists_to_cache.items():
-            cache_item = DiscoverCache.query.get(name)
-            if cache_item: cache_item.content = json.dumps(content)
-            else: db.session.add(DiscoverCache(list_name=name, content=json.dumps(content)))
-        
+        # A failed details lookup only empties the two ranked lists, as before
+        details = {}
+        details_queries = _discover_details_queries(ranked_ids, now_timestamp)
+        if details_queries:
+            try:
+                details = _igdb_multiquery(details_queries)
+            except Exception as e:
+                current_app.logger.error(f"    -> Failed to fetch details for the ranked Discover lists: {e}")
+
+        for name, ids in ranked_ids.items():
+            game_map = {game['id']: game for game in details.get(name, [])}
+            # Keep popularity order, which the details query does not preserve
+            lists_to_cache[name] = [game_map[gid] for gid in ids if gid in game_map][:DISCOVER_LIST_SIZE]
+            current_app.logger.info(f"       - Built '{name}' with {len(lists_to_cache[name])} final games.")
+
+        rows = [{'list_name': name, 'content': orjson.dumps(content).decode()} for name, content in lists_to_cache.items()]
+        stmt = _dialect_insert(DiscoverCache).values(rows)
+        # ON CONFLICT DO UPDATE skips Python-side onupdate hooks, so bump updated_at explicitly
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DiscoverCache.list_name],
+            set_={'content': stmt.excluded.content, 'updated_at': func.now()},
+        )
+        db.session.execute(stmt)
         db.session.commit()
         current_app.logger.info("--- Finished Discover list update ---")
         return True
@@ -1204,4 +1740,4 @@ def update_discover_lists():
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Failed to update Discover lists using API v4: {e}")
-        return False
\ No newline at end of file
+        return False
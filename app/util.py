@@ -1,7 +1,11 @@
 # /gamearr/app/util.py
 
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import json
+import orjson
+from flask.json.provider import DefaultJSONProvider
 
 def timestamp_to_date_filter(s):
     """A custom filter for Jinja2 to use in HTML templates."""
@@ -20,6 +24,43 @@ def fromjson_filter(json_string):
     if not json_string:
         return []
     try:
-        return json.loads(json_string)
-    except (json.JSONDecodeError, TypeError):
-        return []    
\ No newline at end of file
+        return orjson.loads(json_string)
+    except (orjson.JSONDecodeError, TypeError):
+        return []
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, used by jsonify() and request.get_json()."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+class ForkSafeExecutor:
+    """
+    A ThreadPoolExecutor that is created lazily and recreated in every forked child.
+    gunicorn --preload forks workers from a master that may already have pool threads
+    running (the scheduler lives there); a copied pool thinks those threads exist and
+    never runs anything submitted to it.
+    """
+
+    def __init__(self, **executor_kwargs):
+        self._executor_kwargs = executor_kwargs
+        self._executor = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # The copied lock may have been held by a parent thread that no longer exists
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, fn, *args, **kwargs):
+        executor = self._executor
+        if executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(**self._executor_kwargs)
+                executor = self._executor
+        return executor.submit(fn, *args, **kwargs)